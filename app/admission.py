@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from app import db
+from app.metrics import registry
+
+load_dotenv()
+
+# Per-user token bucket: sustained turns per second and the burst allowed on top
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "0.2"))
+ADMISSION_USER_BURST = int(os.getenv("ADMISSION_USER_BURST", "5"))
+# Graph runs executing at once in this process. Defaults to the DB pool size; lower it to
+# what the Vertex AI quota allows per instance if that is smaller.
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", str(db.POSTGRES_POOL_MAX)))
+# Runs waiting for a slot beyond this are turned away at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "50"))
+# Seconds a run waits for a slot before it is turned away
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+RATE_LIMITED_MESSAGE = "You're sending messages faster than I can answer them. Please wait a few seconds and try again."
+BUSY_MESSAGE = "I'm handling a lot of requests right now. Please try again in a moment."
+
+
+class Rejected(Exception):
+    """
+    Raised when a run is not admitted.
+
+    Attributes:
+        reason (str): "rate_limited" or "busy".
+        message (str): Reply to show the user.
+        retry_after (float): Suggested seconds before retrying.
+    """
+
+    def __init__(self, reason, message, retry_after):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Per-key token buckets holding up to `burst` tokens, refilled at `rate` tokens per second.
+
+    Buckets that have refilled completely are dropped once more than `max_keys` are tracked,
+    since a new bucket starts full anyway.
+    """
+
+    def __init__(self, rate=ADMISSION_USER_RATE, burst=ADMISSION_USER_BURST, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated_at)
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def acquire(self, key):
+        """
+        Takes a token for `key`.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                for stale in [k for k in self._buckets if self._tokens(k, now) >= self.burst]:
+                    del self._buckets[stale]
+            return 0.0
+
+    def refund(self, key):
+        """Gives back a token taken by `acquire`, e.g. when the run was not admitted after all."""
+        now = time.monotonic()
+        with self._lock:
+            self._buckets[key] = (min(self.burst, self._tokens(key, now) + 1), now)
+
+
+class AdmissionController:
+    """
+    Admits graph runs: a per-user token bucket limits how often each user can submit, and
+    at most `max_concurrent` runs execute at once, the others waiting in line for up to
+    `queue_timeout` seconds.
+
+    Publishes the gauges `admission_in_flight` and `admission_queue_depth`, the histogram
+    `admission_wait_seconds`, and counts `admission_admitted_total` and
+    `admission_rejections_total` (label `reason`).
+
+    Args:
+        rate (float): Turns per second a user can sustain.
+        burst (int): Turns a user can send at once.
+        max_concurrent (int): Runs executing at the same time.
+        max_queue (int): Runs allowed to wait for a slot.
+        queue_timeout (float): Seconds a run waits for a slot.
+    """
+
+    def __init__(self, rate=ADMISSION_USER_RATE, burst=ADMISSION_USER_BURST,
+                 max_concurrent=ADMISSION_MAX_CONCURRENT, max_queue=ADMISSION_MAX_QUEUE,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.buckets = TokenBucket(rate, burst)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+
+    def _publish(self):
+        registry.set_gauge("admission_in_flight", self._in_flight)
+        registry.set_gauge("admission_queue_depth", self._waiting)
+
+    def _reject(self, reason, message, retry_after):
+        registry.inc("admission_rejections_total", reason=reason)
+        return Rejected(reason, message, retry_after)
+
+    def _acquire_slot(self):
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            if self._in_flight >= self.max_concurrent and self._waiting >= self.max_queue:
+                return False
+            self._waiting += 1
+            self._publish()
+            try:
+                while self._in_flight >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self._in_flight += 1
+            finally:
+                self._waiting -= 1
+                self._publish()
+        registry.histogram("admission_wait_seconds", time.monotonic() - started)
+        return True
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._publish()
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self, user_id):
+        """
+        Holds an execution slot for one run of `user_id`.
+
+        Raises:
+            Rejected: If the user is over their rate, or no slot freed up in time.
+        """
+        retry_after = self.buckets.acquire(user_id)
+        if retry_after:
+            raise self._reject("rate_limited", RATE_LIMITED_MESSAGE, retry_after)
+        if not self._acquire_slot():
+            # The run never started, so it does not count against the user's rate
+            self.buckets.refund(user_id)
+            raise self._reject("busy", BUSY_MESSAGE, self.queue_timeout)
+        registry.inc("admission_admitted_total")
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+
+# Shared by the sessions of this process
+admission = AdmissionController()
@@ -0,0 +1,69 @@
+import asyncio
+import queue
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    """
+    Returns the process-wide event loop, running in a background daemon thread.
+
+    Async resources such as connection pools are bound to the loop they were created on,
+    so every async graph run of the process is scheduled on this one loop.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-graph-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run(coro, timeout=None):
+    """
+    Runs a coroutine on the background loop and waits for its result.
+
+    Args:
+        coro: The coroutine to run.
+        timeout (float, optional): Seconds to wait for the result.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+_DONE = object()
+
+
+def iterate(async_iterable):
+    """
+    Consumes an async iterable on the background loop and yields its items synchronously.
+
+    Lets a synchronous caller (e.g. the Streamlit script thread) drive `graph.astream`.
+    Closing the generator early cancels the underlying iteration.
+    """
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put((True, item))
+        except BaseException as e:
+            items.put((False, e))
+        else:
+            items.put((False, _DONE))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_loop())
+    try:
+        while True:
+            ok, item = items.get()
+            if ok:
+                yield item
+            elif item is _DONE:
+                return
+            else:
+                raise item
+    finally:
+        future.cancel()
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import time
+
+import psycopg
+from dotenv import load_dotenv
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+from app import db
+from app.metrics import registry
+
+load_dotenv()
+
+# Async counterparts of the app.db helpers used by the tools. Queries go through their own
+# psycopg 3 AsyncConnectionPool, built from the same POSTGRES_* settings, and share the
+# read-through caches of app.db.
+ASYNC_POSTGRES_POOL_MIN = int(os.getenv("ASYNC_POSTGRES_POOL_MIN", "1"))
+ASYNC_POSTGRES_POOL_MAX = int(os.getenv("ASYNC_POSTGRES_POOL_MAX", "20"))
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = None
+
+
+async def get_pool():
+    """
+    Returns the process-wide async connection pool, opening it on first use.
+
+    The pool is bound to the event loop it was opened on (see `app.aio`).
+
+    Returns:
+        AsyncConnectionPool: The shared pool.
+    """
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                pool = AsyncConnectionPool(
+                    make_conninfo(
+                        host=db.POSTGRES_HOST,
+                        dbname=db.POSTGRES_DB,
+                        user=db.POSTGRES_USER,
+                        password=db.POSTGRES_PASSWORD,
+                    ),
+                    min_size=ASYNC_POSTGRES_POOL_MIN,
+                    max_size=ASYNC_POSTGRES_POOL_MAX,
+                    timeout=db.POSTGRES_POOL_TIMEOUT,
+                    # Like app.db: autocommit, and statements prepared on first use unless disabled
+                    kwargs={
+                        "autocommit": True,
+                        "prepare_threshold": 0 if db.POSTGRES_PREPARED_STATEMENTS else None,
+                    },
+                    open=False,
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+
+async def close_pool():
+    """Closes the shared async pool, if it was opened."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def pool_stats():
+    """Returns psycopg_pool's usage counters of the shared async pool (empty if not opened)."""
+    return _pool.get_stats() if _pool is not None else {}
+
+
+async def execute_query(query, params=None):
+    """
+    Executes a SQL query on a pooled async connection.
+
+    Args:
+        query (str): The SQL query to execute.
+        params (tuple or dict, optional): Parameters for the query. Defaults to None.
+
+    Returns:
+        list: A list of tuples representing the query results, None for statements that
+        return no rows, or None on error.
+    """
+    statement = db.statement_name(query)
+    try:
+        pool = await get_pool()
+        waited = time.perf_counter()
+        async with pool.connection() as conn:
+            registry.inc("db_async_pool_checkouts_total")
+            registry.histogram("db_async_pool_wait_seconds", time.perf_counter() - waited)
+            with registry.timer("db_query_seconds", statement=statement):
+                cur = await conn.execute(query, params)
+                if cur.description:
+                    return await cur.fetchall()
+                return None
+    except (psycopg.Error, asyncio.TimeoutError) as e:
+        logger.warning("Async query failed: %s", e)
+        registry.inc("db_query_errors_total", statement=statement)
+        return None
+
+
+async def fetch_employee_id(user_id):
+    """Async version of `db.fetch_employee_id`."""
+    result = await execute_query(db.EMPLOYEE_ID_QUERY, (user_id,))
+    if not result:
+        return None
+    return result[0][0]
+
+
+async def resolve_employee_id(user_id):
+    """Async version of `db.resolve_employee_id`, sharing its cache."""
+    if not user_id:
+        return None
+    return await db.employee_id_cache.aget_or_load(user_id, lambda: fetch_employee_id(user_id))
+
+
+async def get_leave_balance(employee_id):
+    """Async version of `db.get_leave_balance`, sharing its cache."""
+    return await db.leave_balance_cache.aget_or_load(
+        employee_id, lambda: execute_query(db.EMPLOYEE_LEAVE_BALANCE_QUERY, (employee_id,))
+    )
+
+
+async def get_pending_leave_requests(employee_id):
+    """Async version of `db.get_pending_leave_requests`, sharing its cache."""
+    return await db.pending_requests_cache.aget_or_load(
+        employee_id, lambda: execute_query(db.PENDING_LEAVE_REQUESTS_QUERY, (employee_id,))
+    )
+
+
+async def create_user_leave_request(user_id, leave_type_id, start_date, end_date, days_requested, reason):
+    """
+    Async version of `db.create_user_leave_request`.
+
+    Returns:
+        The employee's ID if the request was created, or None if the user or leave type is
+        unknown or there is an error.
+    """
+    result = await execute_query(
+        db.CREATE_USER_LEAVE_REQUEST_QUERY,
+        (start_date, end_date, days_requested, reason, leave_type_id, user_id),
+    )
+    if not result:
+        return None
+    employee_id = result[0][0]
+    db.invalidate_employee_cache(employee_id)
+    return employee_id
+
+
+async def create_user_leave_requests(user_id, requests):
+    """
+    Async version of `db.create_user_leave_requests`.
+
+    psycopg 3 binds parameters server-side, which allows one statement per query, so the
+    lock and the batch are sent together in pipeline mode inside an explicit transaction.
+
+    Returns:
+        list: One (status, leave_request_id, remaining_days) tuple per request, in order,
+        or None if there is an error.
+    """
+    if not requests:
+        return []
+    params = db.leave_batch_params(user_id, requests)
+    try:
+        pool = await get_pool()
+        waited = time.perf_counter()
+        async with pool.connection() as conn:
+            registry.inc("db_async_pool_checkouts_total")
+            registry.histogram("db_async_pool_wait_seconds", time.perf_counter() - waited)
+            with registry.timer("db_query_seconds", statement=db.LEAVE_BATCH_STATEMENT):
+                async with conn.pipeline(), conn.transaction():
+                    await conn.execute(db.LOCK_EMPLOYEE_QUERY, params)
+                    cur = await conn.execute(db.CREATE_USER_LEAVE_REQUESTS_QUERY, params)
+                    rows = await cur.fetchall()
+    except (psycopg.Error, asyncio.TimeoutError) as e:
+        logger.warning("Async leave request batch failed: %s", e)
+        registry.inc("db_query_errors_total", statement=db.LEAVE_BATCH_STATEMENT)
+        return None
+    return db.leave_batch_results(rows)
+
+
+async def get_leave_dashboard(employee_id):
+    """Async version of `db.get_leave_dashboard`, sharing its cache."""
+    return await db.leave_dashboard_cache.aget_or_load(
+        employee_id,
+        lambda: execute_query(
+            db.LEAVE_DASHBOARD_QUERY,
+            (employee_id, employee_id, employee_id, db.LEAVE_DASHBOARD_RECENT_LIMIT),
+        ),
+    )
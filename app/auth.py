@@ -1,9 +1,15 @@
+import hashlib
+import threading
+
 import requests
 import streamlit as st
-from msal import ConfidentialClientApplication
+from msal import ConfidentialClientApplication, TokenCache
+from requests.adapters import HTTPAdapter
 import os
 from dotenv import load_dotenv
 
+from app.cache import InMemoryCacheBackend, ReadThroughCache
+
 # Load environment variables from a `.env` file
 load_dotenv()
 
@@ -14,18 +20,66 @@ CLIENT_SECRET = os.environ.get('CLIENT_SECRET')
 REDIRECT_URI = os.environ.get('REDIRECT_URI')
 SCOPES = ["User.Read"]  # Define required scopes here
 
+# Endpoints, overridable to point at a sovereign cloud or a local mock identity server
+AZURE_AUTHORITY_HOST = os.environ.get('AZURE_AUTHORITY_HOST', 'https://login.microsoftonline.com').rstrip('/')
+GRAPH_API_URL = os.environ.get('GRAPH_API_URL', 'https://graph.microsoft.com/v1.0').rstrip('/')
+# Validate the authority host against Microsoft's instance discovery; disable for a mock server
+AZURE_INSTANCE_DISCOVERY = os.environ.get('AZURE_INSTANCE_DISCOVERY', 'true').lower() == 'true'
+# Seconds allowed for each call to Azure AD or Microsoft Graph
+AUTH_HTTP_TIMEOUT = float(os.environ.get('AUTH_HTTP_TIMEOUT', '10'))
+# How long a signed-in user's Graph /me profile is reused, in seconds
+GRAPH_PROFILE_CACHE_TTL = float(os.environ.get('GRAPH_PROFILE_CACHE_TTL', '300'))
+
+_http_session = None
+_app = None
+_app_lock = threading.Lock()
+
+# Tokens of every signed-in account of this process, shared by its sessions. Kept in
+# memory only: refresh tokens never leave the process.
+token_cache = TokenCache()
+# Graph /me profiles by token subject (object ID); in memory, as they are personal data
+profile_cache = ReadThroughCache(
+    "graph_profile", backend=InMemoryCacheBackend(ttl=GRAPH_PROFILE_CACHE_TTL), ttl=GRAPH_PROFILE_CACHE_TTL
+)
+
+def get_http_session():
+    """Returns the process-wide HTTP session used for Azure AD and Graph calls, keeping connections alive."""
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_session = session
+    return _http_session
+
 def initialize_app():
-    """Initializes the ConfidentialClientApplication object."""
-    authority_url = f"https://login.microsoftonline.com/{TENANT_ID}"
-    try:
-        return ConfidentialClientApplication(
-            client_id=CLIENT_ID,
-            authority=authority_url,
-            client_credential=CLIENT_SECRET,
-        )
-    except Exception as e:
-        st.error("An error occurred while initializing the application. Please try again later.")
-        return None  # Indicate failure
+    """
+    Returns the process-wide ConfidentialClientApplication object, creating it on first use.
+
+    Creating it runs the authority's OIDC discovery, so it is done once per process rather
+    than on every rerun. A failed creation is retried on the next call.
+    """
+    global _app
+    if _app is not None:
+        return _app
+    authority_url = f"{AZURE_AUTHORITY_HOST}/{TENANT_ID}"
+    with _app_lock:
+        if _app is None:
+            try:
+                _app = ConfidentialClientApplication(
+                    client_id=CLIENT_ID,
+                    authority=authority_url,
+                    client_credential=CLIENT_SECRET,
+                    token_cache=token_cache,
+                    http_client=get_http_session(),
+                    timeout=AUTH_HTTP_TIMEOUT,
+                    instance_discovery=None if AZURE_INSTANCE_DISCOVERY else False,
+                )
+            except Exception as e:
+                st.error("An error occurred while initializing the application. Please try again later.")
+                return None  # Indicate failure
+    return _app
 
 def acquire_access_token(app, code):
     """Acquires an access token using the authorization code."""
@@ -40,29 +94,89 @@ def acquire_access_token(app, code):
         st.error("An error occurred while acquiring the access token. Please try again later.")
         return None
 
+def home_account_id(token_result):
+    """Returns the MSAL home account ID ("<object id>.<tenant id>") of a token result, if known."""
+    claims = token_result.get("id_token_claims") or {}
+    if claims.get("oid") and claims.get("tid"):
+        return f"{claims['oid']}.{claims['tid']}"
+    return None
+
+def acquire_token_silently(app, account_id):
+    """
+    Returns a valid token for a signed-in account from the token cache, using its refresh
+    token if the access token has expired. Returns None if the account must sign in again.
+    """
+    if not account_id:
+        return None
+    try:
+        accounts = [account for account in app.get_accounts() if account.get("home_account_id") == account_id]
+        if not accounts:
+            return None
+        token_result = app.acquire_token_silent(SCOPES, account=accounts[0])
+    except Exception:
+        return None
+    if token_result and "access_token" in token_result:
+        # Tokens served from the cache carry no ID token; identify the user from the account
+        token_result.setdefault("id_token_claims", {"oid": accounts[0].get("local_account_id"), "tid": accounts[0].get("realm")})
+        return token_result
+    return None
+
+def redeem_code(app, code):
+    """
+    Exchanges an authorization code for tokens. Reruns of the session that redeemed the
+    code get its account's token silently instead of repeating the exchange; any other
+    session presenting the code must exchange it, which the identity provider refuses
+    for a code already used.
+    """
+    key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    if st.session_state.get("redeemed_code") == key:
+        token_result = acquire_token_silently(app, st.session_state.get("account_id"))
+        if token_result:
+            return token_result
+    token_result = acquire_access_token(app, code)
+    if token_result:
+        st.session_state["redeemed_code"] = key
+        st.session_state["account_id"] = home_account_id(token_result)
+    return token_result
+
 def fetch_user_data(access_token):
     """Fetches user data from the Microsoft Graph API."""
     headers = {"Authorization": f"Bearer {access_token}"}
-    graph_api_endpoint = "https://graph.microsoft.com/v1.0/me"
-    response = requests.get(graph_api_endpoint, headers=headers)
+    graph_api_endpoint = f"{GRAPH_API_URL}/me"
+    try:
+        response = get_http_session().get(graph_api_endpoint, headers=headers, timeout=AUTH_HTTP_TIMEOUT)
+    except requests.RequestException:
+        st.error("Microsoft Graph did not respond. Please try again later.")
+        return None
     if response.status_code == 200:
         return response.json()
     else:
         st.error("An error occurred while fetching user data. Please try again later.")
         return None
 
+def get_user_profile(token_result):
+    """Returns the Graph /me profile of a token's user, cached by the token's subject."""
+    claims = token_result.get("id_token_claims") or {}
+    subject = claims.get("oid") or claims.get("sub")
+    if not subject:
+        return fetch_user_data(token_result["access_token"])
+    return profile_cache.get_or_load(subject, lambda: fetch_user_data(token_result["access_token"]))
+
 def authentication_process(app):
     """Handles the authentication flow with Streamlit."""
     auth_url = app.get_authorization_request_url(scopes=SCOPES, redirect_uri=REDIRECT_URI)
     st.sidebar.markdown(f"Please go to [this URL]({auth_url}) and authorize the app.")
 
     if st.query_params.get("code"):
-        access_token = acquire_access_token(app, st.query_params.get("code"))
+        access_token = redeem_code(app, st.query_params.get("code"))
         if access_token:
-            user_data = fetch_user_data(access_token["access_token"])
+            user_data = get_user_profile(access_token)
             if user_data:
                 st.session_state["user_id"] = user_data.get("id")  # Assuming user ID is in "id" field
                 st.session_state["token"] = access_token
+                st.session_state["account_id"] = home_account_id(access_token)
+                # Drop the used code from the URL, so it stays out of history, bookmarks and Referer headers
+                st.query_params.clear()
                 return user_data, access_token
             else:
                 st.error("Failed to fetch user data")
@@ -73,5 +187,13 @@ def get_user_id():
     return st.session_state.get("user_id")
 
 def get_token():
-    """Retrieves the access token from session state, if available."""
-    return st.session_state.get("token")
\ No newline at end of file
+    """
+    Retrieves the access token from session state, if available, refreshed silently from
+    the token cache once it has expired.
+    """
+    account_id = st.session_state.get("account_id")
+    app = initialize_app() if account_id else None
+    token_result = acquire_token_silently(app, account_id) if app else None
+    if token_result:
+        st.session_state["token"] = token_result
+    return st.session_state.get("token")
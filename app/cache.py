@@ -0,0 +1,193 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from app.metrics import registry
+
+load_dotenv()
+
+# Cache backend: "memory" (per process) or "redis" (shared, needs the `redis` package)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Returned by backends on a cache miss, so that falsy values (e.g. []) can be cached
+MISS = object()
+
+
+class InMemoryCacheBackend:
+    """
+    A thread-safe in-process cache with per-entry TTL and LRU eviction.
+
+    Args:
+        maxsize (int): Maximum number of entries; the least recently used entry is evicted first.
+        ttl (float): Default time to live of an entry, in seconds.
+    """
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    A cache backend shared between instances through Redis.
+
+    Works with any client exposing redis-py's `get`, `set(..., ex=...)` and `delete`,
+    such as a local Redis-compatible server or an in-process stand-in. Size limits are
+    left to the server's `maxmemory-policy` (e.g. `allkeys-lru`).
+
+    Args:
+        client: The Redis client.
+        prefix (str): Prefix added to every key.
+        ttl (float): Default time to live of an entry, in seconds.
+    """
+
+    def __init__(self, client, prefix="hr-leave:", ttl=CACHE_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        # Values are written by this app only, so unpickling them is safe
+        return MISS if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def create_backend(kind=None, **kwargs):
+    """
+    Creates a cache backend.
+
+    Args:
+        kind (str, optional): "memory" or "redis". Defaults to the CACHE_BACKEND setting.
+        **kwargs: Passed to the backend's constructor.
+
+    Returns:
+        The cache backend.
+    """
+    kind = (kind or CACHE_BACKEND).lower()
+    if kind == "redis":
+        import redis  # Optional dependency, only needed for the shared backend
+
+        return RedisCacheBackend(redis.Redis.from_url(REDIS_URL), **kwargs)
+    if kind != "memory":
+        raise ValueError(f"Unknown cache backend: {kind}")
+    return InMemoryCacheBackend(**kwargs)
+
+
+class ReadThroughCache:
+    """
+    Serves values from a cache backend and loads them on a miss.
+
+    Hits and misses are counted per cache and published as `cache_hits_total` and
+    `cache_misses_total` with a `cache` label.
+
+    Args:
+        name (str): Name of the cache, used as key prefix and metrics label.
+        backend: Cache backend. Defaults to one built by `create_backend`.
+        ttl (float, optional): Time to live of the entries, in seconds. Defaults to the backend's.
+    """
+
+    def __init__(self, name, backend=None, ttl=None):
+        self.name = name
+        self.backend = backend or create_backend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for `key`, or calls `loader()` and caches its result.
+
+        A `None` result is treated as an error and is not cached.
+        """
+        value = self.backend.get(self._key(key))
+        if value is not MISS:
+            self.hits += 1
+            registry.inc("cache_hits_total", cache=self.name)
+            return value
+        self.misses += 1
+        registry.inc("cache_misses_total", cache=self.name)
+        value = loader()
+        if value is not None:
+            self.backend.set(self._key(key), value, self.ttl)
+        return value
+
+    async def aget_or_load(self, key, loader):
+        """Async version of `get_or_load`; `loader` is a coroutine function."""
+        value = self.backend.get(self._key(key))
+        if value is not MISS:
+            self.hits += 1
+            registry.inc("cache_hits_total", cache=self.name)
+            return value
+        self.misses += 1
+        registry.inc("cache_misses_total", cache=self.name)
+        value = await loader()
+        if value is not None:
+            self.backend.set(self._key(key), value, self.ttl)
+        return value
+
+    def put(self, key, value):
+        """Stores a value for `key` without loading it, e.g. to warm the cache."""
+        self.backend.set(self._key(key), value, self.ttl)
+
+    def invalidate(self, key):
+        """Removes the cached value for `key`."""
+        self.backend.delete(self._key(key))
+
+    def stats(self):
+        """Returns the hit and miss counters of this process."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,543 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from langgraph.checkpoint.base.id import UUID
+from langgraph.checkpoint.memory import MemorySaver
+
+from app import db
+from app.metrics import registry
+
+load_dotenv()
+
+# Checkpointer backend: "memory" (bounded, in-process), "postgres", "sqlite", or "auto"
+# ("postgres" when POSTGRES_HOST is set, "sqlite" otherwise)
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "memory").lower()
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite")
+CHECKPOINT_POSTGRES_POOL_MAX = int(os.getenv("CHECKPOINT_POSTGRES_POOL_MAX", "5"))
+
+# Retention settings shared by every backend
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_IDLE_TTL = float(os.getenv("CHECKPOINT_IDLE_TTL", "86400"))
+CHECKPOINT_SWEEP_INTERVAL = float(os.getenv("CHECKPOINT_SWEEP_INTERVAL", "300"))
+
+# Limits of the in-process tier
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+CHECKPOINT_MEMORY_LIMIT_MB = float(os.getenv("CHECKPOINT_MEMORY_LIMIT_MB", "256"))
+
+logger = logging.getLogger(__name__)
+
+
+def _payload_size(value):
+    """Approximates the memory held by a serialized checkpoint entry."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_payload_size(v) for v in value)
+    return 0
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    An in-memory checkpointer with bounded growth.
+
+    On top of `MemorySaver` it keeps only the latest `keep_last` checkpoints per thread,
+    evicts threads idle for longer than `idle_ttl` seconds, and evicts least-recently-used
+    threads once more than `max_threads` are stored or the serialized size exceeds `max_bytes`.
+
+    Args:
+        keep_last (int): Checkpoints kept per thread and namespace.
+        idle_ttl (float): Seconds of inactivity after which a thread is dropped.
+        max_threads (int): Maximum number of threads kept in memory.
+        max_bytes (int): Approximate ceiling for the serialized checkpoint data.
+    """
+
+    def __init__(self, *, keep_last=CHECKPOINT_KEEP_LAST, idle_ttl=CHECKPOINT_IDLE_TTL,
+                 max_threads=CHECKPOINT_MAX_THREADS,
+                 max_bytes=int(CHECKPOINT_MEMORY_LIMIT_MB * 1024 * 1024), **kwargs):
+        super().__init__(**kwargs)
+        self.keep_last = keep_last
+        self.idle_ttl = idle_ttl
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._last_access = OrderedDict()  # thread_id -> monotonic time of last use
+        self._thread_bytes = {}
+        self._write_keys = defaultdict(set)  # thread_id -> keys of self.writes
+        self._blob_keys = defaultdict(set)  # thread_id -> keys of self.blobs
+        self.evictions = 0
+
+    def _touch(self, thread_id):
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def get_tuple(self, config):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            result = super().get_tuple(config)
+            if thread_id in self._last_access:
+                self._touch(thread_id)
+            elif not any(self.storage.get(thread_id, {}).values()):
+                # MemorySaver's defaultdicts create empty entries for unknown threads
+                self.storage.pop(thread_id, None)
+            return result
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._lock:
+            items = [*super().list(config, filter=filter, before=before, limit=limit)]
+        yield from items
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            result = super().put(config, checkpoint, metadata, new_versions)
+            self._blob_keys[thread_id].update(
+                (thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()
+            )
+            self._touch(thread_id)
+            self._compact(thread_id, checkpoint_ns)
+            self._account(thread_id)
+            self._evict(keep=thread_id)
+            return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            super().put_writes(config, writes, task_id, task_path)
+            self._write_keys[thread_id].add(
+                (thread_id, config["configurable"].get("checkpoint_ns", ""),
+                 config["configurable"]["checkpoint_id"])
+            )
+            self._touch(thread_id)
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self._drop(thread_id)
+
+    def _compact(self, thread_id, checkpoint_ns):
+        """Drops all but the latest `keep_last` checkpoints of a thread namespace."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+        # Checkpoint ids are time-ordered (uuid6), so the newest sort last
+        ordered = sorted(checkpoints)
+        for checkpoint_id in ordered[:-self.keep_last]:
+            del checkpoints[checkpoint_id]
+            write_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(write_key, None)
+            self._write_keys[thread_id].discard(write_key)
+
+        # Keep only the channel values still referenced by a remaining checkpoint
+        referenced = set()
+        for saved in checkpoints.values():
+            versions = self.serde.loads_typed(saved[0]).get("channel_versions", {})
+            referenced.update((thread_id, checkpoint_ns, k, v) for k, v in versions.items())
+        for key in [k for k in self._blob_keys[thread_id] if k[1] == checkpoint_ns]:
+            if key not in referenced:
+                self.blobs.pop(key, None)
+                self._blob_keys[thread_id].discard(key)
+
+    def _account(self, thread_id):
+        size = _payload_size(
+            [saved for ns in self.storage[thread_id].values() for saved in ns.values()]
+        )
+        size += _payload_size(
+            [w for key in self._write_keys[thread_id] for w in self.writes.get(key, {}).values()]
+        )
+        size += _payload_size([self.blobs[key] for key in self._blob_keys[thread_id] if key in self.blobs])
+        self._thread_bytes[thread_id] = size
+
+    def _evict(self, keep=None):
+        """Evicts idle threads, then least-recently-used ones while over the limits."""
+        now = time.monotonic()
+        while self._last_access:
+            thread_id, last_access = next(iter(self._last_access.items()))
+            if thread_id == keep:
+                break
+            over_limit = (
+                len(self._last_access) > self.max_threads
+                or sum(self._thread_bytes.values()) > self.max_bytes
+            )
+            if not over_limit and now - last_access <= self.idle_ttl:
+                break
+            self._drop(thread_id)
+            self.evictions += 1
+            registry.inc("checkpoint_evictions_total", backend="memory")
+        registry.set_gauge("checkpoint_threads", len(self._last_access), backend="memory")
+        registry.set_gauge("checkpoint_bytes", sum(self._thread_bytes.values()), backend="memory")
+
+    def _drop(self, thread_id):
+        self.storage.pop(thread_id, None)
+        # Reads also create (empty) write entries, so scan rather than trust _write_keys
+        for key in [k for k in self.writes if k[0] == thread_id]:
+            del self.writes[key]
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self._write_keys.pop(thread_id, None)
+        self._last_access.pop(thread_id, None)
+        self._thread_bytes.pop(thread_id, None)
+
+    def stats(self):
+        """Returns the number of stored threads, their approximate size and the eviction count."""
+        with self._lock:
+            return {
+                "threads": len(self._last_access),
+                "bytes": sum(self._thread_bytes.values()),
+                "evictions_total": self.evictions,
+            }
+
+
+def _cutoff_checkpoint_id(idle_ttl):
+    """
+    Builds the smallest checkpoint id that could have been created `idle_ttl` seconds ago.
+
+    Checkpoint ids are uuid6 values whose leading bits are a timestamp, so comparing ids as
+    strings compares their creation times.
+    """
+    timestamp = int((time.time() - idle_ttl) * 1e7) + 0x01B21DD213814000
+    uuid_int = ((timestamp >> 12) & 0xFFFFFFFFFFFF) << 80
+    uuid_int |= (timestamp & 0x0FFF) << 64
+    return str(UUID(int=uuid_int, version=6))
+
+
+def _create_postgres_checkpointer():
+    from psycopg.conninfo import make_conninfo
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+    from langgraph.checkpoint.postgres import PostgresSaver
+
+    conninfo = make_conninfo(
+        host=db.POSTGRES_HOST,
+        dbname=db.POSTGRES_DB,
+        user=db.POSTGRES_USER,
+        password=db.POSTGRES_PASSWORD,
+    )
+    pool = ConnectionPool(
+        conninfo,
+        max_size=CHECKPOINT_POSTGRES_POOL_MAX,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=True,
+    )
+    try:
+        pool.wait(timeout=db.POSTGRES_POOL_TIMEOUT)
+        saver = PostgresSaver(pool)
+        saver.setup()
+    except Exception:
+        pool.close()
+        raise
+    return saver
+
+
+def _create_sqlite_checkpointer():
+    import sqlite3
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    saver = SqliteSaver(sqlite3.connect(CHECKPOINT_SQLITE_PATH, check_same_thread=False))
+    saver.setup()
+    return saver
+
+
+def create_checkpointer(backend=None):
+    """
+    Creates the checkpointer used by the compiled graph.
+
+    Args:
+        backend (str, optional): "memory", "postgres", "sqlite" or "auto".
+            Defaults to the CHECKPOINTER_BACKEND setting.
+
+    Returns:
+        BaseCheckpointSaver: The checkpointer. If the Postgres backend cannot be reached,
+        the SQLite backend is used instead.
+    """
+    backend = (backend or CHECKPOINTER_BACKEND).lower()
+    if backend == "auto":
+        backend = "postgres" if db.POSTGRES_HOST else "sqlite"
+    if backend == "postgres":
+        try:
+            return _create_postgres_checkpointer()
+        except Exception as e:
+            logger.warning("Postgres checkpointer unavailable, falling back to SQLite: %s", e)
+            backend = "sqlite"
+    if backend == "sqlite":
+        return _create_sqlite_checkpointer()
+    if backend != "memory":
+        raise ValueError(f"Unknown checkpointer backend: {backend}")
+    return BoundedMemorySaver()
+
+
+async def create_async_checkpointer(backend=None):
+    """
+    Creates a checkpointer usable by `graph.astream`, bound to the running event loop.
+
+    The async savers also serve synchronous calls made from other threads.
+
+    Args:
+        backend (str, optional): See `create_checkpointer`.
+
+    Returns:
+        BaseCheckpointSaver: The checkpointer.
+    """
+    backend = (backend or CHECKPOINTER_BACKEND).lower()
+    if backend == "auto":
+        backend = "postgres" if db.POSTGRES_HOST else "sqlite"
+    if backend == "postgres":
+        from psycopg.conninfo import make_conninfo
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+        pool = AsyncConnectionPool(
+            make_conninfo(
+                host=db.POSTGRES_HOST,
+                dbname=db.POSTGRES_DB,
+                user=db.POSTGRES_USER,
+                password=db.POSTGRES_PASSWORD,
+            ),
+            max_size=CHECKPOINT_POSTGRES_POOL_MAX,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False,
+        )
+        try:
+            await pool.open(wait=True, timeout=db.POSTGRES_POOL_TIMEOUT)
+            saver = AsyncPostgresSaver(pool)
+            await saver.setup()
+            return saver
+        except Exception as e:
+            await pool.close()
+            logger.warning("Postgres checkpointer unavailable, falling back to SQLite: %s", e)
+            backend = "sqlite"
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        saver = AsyncSqliteSaver(await aiosqlite.connect(CHECKPOINT_SQLITE_PATH))
+        await saver.setup()
+        return saver
+    if backend != "memory":
+        raise ValueError(f"Unknown checkpointer backend: {backend}")
+    return BoundedMemorySaver()
+
+
+# Retention statements of the durable backends, shared by the sync and async savers
+POSTGRES_COMPACT_CHECKPOINTS_SQL = """
+WITH stale AS (
+    SELECT checkpoint_ns, checkpoint_id FROM (
+        SELECT checkpoint_ns, checkpoint_id,
+               row_number() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+        FROM checkpoints WHERE thread_id = %(thread_id)s
+    ) ranked
+    WHERE rn > %(keep_last)s
+), deleted_writes AS (
+    DELETE FROM checkpoint_writes w USING stale s
+    WHERE w.thread_id = %(thread_id)s
+      AND w.checkpoint_ns = s.checkpoint_ns AND w.checkpoint_id = s.checkpoint_id
+)
+DELETE FROM checkpoints c USING stale s
+WHERE c.thread_id = %(thread_id)s
+  AND c.checkpoint_ns = s.checkpoint_ns AND c.checkpoint_id = s.checkpoint_id;
+"""
+
+POSTGRES_COMPACT_BLOBS_SQL = """
+DELETE FROM checkpoint_blobs b
+WHERE b.thread_id = %(thread_id)s AND NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+      AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+);
+"""
+
+SQLITE_COMPACT_CHECKPOINTS_SQL = """
+DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id NOT IN (
+    SELECT checkpoint_id FROM checkpoints c
+    WHERE c.thread_id = checkpoints.thread_id AND c.checkpoint_ns = checkpoints.checkpoint_ns
+    ORDER BY checkpoint_id DESC LIMIT ?
+);
+"""
+
+SQLITE_COMPACT_WRITES_SQL = """
+DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+      AND c.checkpoint_id = writes.checkpoint_id
+);
+"""
+
+POSTGRES_EVICT_IDLE_SQL = """
+WITH idle AS (
+    SELECT thread_id FROM checkpoints
+    GROUP BY thread_id HAVING max(checkpoint_id) < %(cutoff)s
+), deleted_writes AS (
+    DELETE FROM checkpoint_writes WHERE thread_id IN (SELECT thread_id FROM idle)
+), deleted_blobs AS (
+    DELETE FROM checkpoint_blobs WHERE thread_id IN (SELECT thread_id FROM idle)
+)
+DELETE FROM checkpoints WHERE thread_id IN (SELECT thread_id FROM idle);
+"""
+
+SQLITE_IDLE_THREADS_SQL = "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING max(checkpoint_id) < ?"
+SQLITE_EVICT_IDLE_SQL = (
+    f"DELETE FROM writes WHERE thread_id IN ({SQLITE_IDLE_THREADS_SQL});",
+    f"DELETE FROM checkpoints WHERE thread_id IN ({SQLITE_IDLE_THREADS_SQL});",
+)
+
+
+@contextmanager
+def _postgres_connection(saver):
+    conn = saver.conn
+    if hasattr(conn, "connection"):  # psycopg_pool.ConnectionPool
+        with conn.connection() as pooled:
+            yield pooled
+    else:
+        yield conn
+
+
+def compact_thread(saver, thread_id, keep_last=CHECKPOINT_KEEP_LAST):
+    """
+    Deletes all but the latest `keep_last` checkpoints (and their writes) of a thread.
+
+    The in-memory backend compacts on every write, so this only acts on durable backends.
+
+    Args:
+        saver: The checkpointer returned by `create_checkpointer`.
+        thread_id (str): The conversation thread to compact.
+        keep_last (int): Number of checkpoints kept per namespace.
+    """
+    kind = type(saver).__name__
+    if kind == "PostgresSaver":
+        with _postgres_connection(saver) as conn, conn.transaction():
+            conn.execute(POSTGRES_COMPACT_CHECKPOINTS_SQL, {"thread_id": thread_id, "keep_last": keep_last})
+            conn.execute(POSTGRES_COMPACT_BLOBS_SQL, {"thread_id": thread_id})
+    elif kind == "SqliteSaver":
+        with saver.cursor() as cur:
+            cur.execute(SQLITE_COMPACT_CHECKPOINTS_SQL, (thread_id, keep_last))
+            cur.execute(SQLITE_COMPACT_WRITES_SQL, (thread_id,))
+
+
+def evict_idle_threads(saver, idle_ttl=CHECKPOINT_IDLE_TTL):
+    """
+    Deletes every thread whose latest checkpoint is older than `idle_ttl` seconds.
+
+    Args:
+        saver: The checkpointer returned by `create_checkpointer`.
+        idle_ttl (float): Idle time in seconds after which a thread is deleted.
+    """
+    kind = type(saver).__name__
+    cutoff = _cutoff_checkpoint_id(idle_ttl)
+    if kind == "PostgresSaver":
+        with _postgres_connection(saver) as conn, conn.transaction():
+            conn.execute(POSTGRES_EVICT_IDLE_SQL, {"cutoff": cutoff})
+    elif kind == "SqliteSaver":
+        with saver.cursor() as cur:
+            for statement in SQLITE_EVICT_IDLE_SQL:
+                cur.execute(statement, (cutoff,))
+    elif isinstance(saver, BoundedMemorySaver):
+        with saver._lock:
+            saver._evict()
+
+
+def has_checkpoint(saver, thread_id):
+    """
+    Tells whether `saver` still holds a conversation, which eviction (idle threads, or the
+    in-memory limits) may have removed. A failed lookup counts as present, so the chat goes on.
+
+    Args:
+        saver: The checkpointer returned by `create_checkpointer`.
+        thread_id (str): The conversation thread.
+
+    Returns:
+        bool: False if the thread has no checkpoint.
+    """
+    try:
+        return saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}) is not None
+    except Exception as e:
+        logger.warning("Checkpoint lookup failed: %s", e)
+        return True
+
+
+async def ahas_checkpoint(saver, thread_id):
+    """Async version of `has_checkpoint` for the savers of `create_async_checkpointer`."""
+    try:
+        return await saver.aget_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}) is not None
+    except Exception as e:
+        logger.warning("Checkpoint lookup failed: %s", e)
+        return True
+
+
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+def maintain(saver, thread_id):
+    """
+    Applies the retention policy after a conversation turn.
+
+    Compacts the thread that was just written and, at most every CHECKPOINT_SWEEP_INTERVAL
+    seconds, evicts idle threads. Failures are logged and never interrupt the chat.
+
+    Args:
+        saver: The checkpointer returned by `create_checkpointer`.
+        thread_id (str): The thread of the turn that just completed.
+    """
+    try:
+        compact_thread(saver, thread_id)
+        if _sweep_due():
+            evict_idle_threads(saver)
+    except Exception as e:
+        logger.warning("Checkpoint maintenance failed: %s", e)
+
+
+async def acompact_thread(saver, thread_id, keep_last=CHECKPOINT_KEEP_LAST):
+    """Async version of `compact_thread` for the savers of `create_async_checkpointer`."""
+    kind = type(saver).__name__
+    if kind == "AsyncPostgresSaver":
+        async with saver.conn.connection() as conn, conn.transaction():
+            await conn.execute(POSTGRES_COMPACT_CHECKPOINTS_SQL, {"thread_id": thread_id, "keep_last": keep_last})
+            await conn.execute(POSTGRES_COMPACT_BLOBS_SQL, {"thread_id": thread_id})
+    elif kind == "AsyncSqliteSaver":
+        async with saver.lock:
+            await saver.conn.execute(SQLITE_COMPACT_CHECKPOINTS_SQL, (thread_id, keep_last))
+            await saver.conn.execute(SQLITE_COMPACT_WRITES_SQL, (thread_id,))
+            await saver.conn.commit()
+    else:
+        compact_thread(saver, thread_id, keep_last)
+
+
+async def aevict_idle_threads(saver, idle_ttl=CHECKPOINT_IDLE_TTL):
+    """Async version of `evict_idle_threads` for the savers of `create_async_checkpointer`."""
+    kind = type(saver).__name__
+    cutoff = _cutoff_checkpoint_id(idle_ttl)
+    if kind == "AsyncPostgresSaver":
+        async with saver.conn.connection() as conn, conn.transaction():
+            await conn.execute(POSTGRES_EVICT_IDLE_SQL, {"cutoff": cutoff})
+    elif kind == "AsyncSqliteSaver":
+        async with saver.lock:
+            for statement in SQLITE_EVICT_IDLE_SQL:
+                await saver.conn.execute(statement, (cutoff,))
+            await saver.conn.commit()
+    else:
+        evict_idle_threads(saver, idle_ttl)
+
+
+def _sweep_due():
+    global _last_sweep
+    now = time.monotonic()
+    with _sweep_lock:
+        if now - _last_sweep < CHECKPOINT_SWEEP_INTERVAL:
+            return False
+        _last_sweep = now
+        return True
+
+
+async def amaintain(saver, thread_id):
+    """Async version of `maintain`."""
+    try:
+        await acompact_thread(saver, thread_id)
+        if _sweep_due():
+            await aevict_idle_threads(saver)
+    except Exception as e:
+        logger.warning("Checkpoint maintenance failed: %s", e)
@@ -0,0 +1,109 @@
+import functools
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from app.metrics import registry
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Environment variable setup for Vertex AI
+PROJECT_ID = os.environ.get('PROJECT_ID')
+REGION = os.environ.get('REGION')
+MODEL_NAME = os.environ.get('MODEL_NAME')
+
+# Create the chat workflow and its clients in the background once the login page has rendered
+STARTUP_WARM_UP = os.environ.get('STARTUP_WARM_UP', 'true').lower() == 'true'
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+
+def cached_factory(factory):
+    """
+    Turns `factory` into a process-wide lazy singleton: it runs on the first call, and later
+    calls return its result. Creation is serialized by a lock, so the warm-up thread and a
+    session asking for the same client create it once. A failed creation is retried on the
+    next call.
+
+    Creation times are published as the `client_init_seconds` histogram (label `client`).
+    """
+    lock = threading.Lock()
+    instances = []
+
+    @functools.wraps(factory)
+    def get():
+        if instances:
+            return instances[0]
+        with lock:
+            if not instances:
+                with registry.timer("client_init_seconds", client=factory.__name__.removeprefix("get_")):
+                    instances.append(factory())
+        return instances[0]
+
+    get.initialized = lambda: bool(instances)
+    return get
+
+
+@cached_factory
+def get_chat_llm():
+    """Returns the Vertex AI chat model. Importing the Vertex AI SDK alone takes seconds."""
+    import vertexai
+    from langchain_google_vertexai import ChatVertexAI
+
+    vertexai.init(project=PROJECT_ID, location=REGION)
+    return ChatVertexAI(
+        model_name=MODEL_NAME,
+        max_output_tokens=8192,
+        temperature=1.0,
+        top_p=0.95
+    )
+
+
+@cached_factory
+def get_langfuse_handler():
+    """Returns the Langfuse tracing callback handler."""
+    from langfuse.callback import CallbackHandler
+
+    return CallbackHandler(
+        secret_key=os.environ.get('LANGFUSE_SECRET_KEY'),
+        public_key=os.environ.get('LANGFUSE_PUBLIC_KEY'),
+        host=os.environ.get('LANGFUSE_HOST')
+    )
+
+
+def start_warm_up(*hooks):
+    """
+    Runs `hooks` one after another in a background daemon thread, once per process, so
+    the first chat turn finds the heavy modules imported and the clients created. Failures
+    are logged; the hooks' factories retry when the turn needs them.
+
+    The total time is published as the `startup_warm_up_seconds` histogram.
+
+    Returns:
+        bool: True if this call started the warm-up.
+    """
+    global _warm_up_started
+    if not STARTUP_WARM_UP:
+        return False
+    with _warm_up_lock:
+        if _warm_up_started:
+            return False
+        _warm_up_started = True
+
+    def run():
+        started = time.monotonic()
+        for hook in hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("Warm-up hook %s failed", getattr(hook, "__name__", hook))
+        registry.histogram("startup_warm_up_seconds", time.monotonic() - started)
+
+    threading.Thread(target=run, name="startup-warm-up", daemon=True).start()
+    return True
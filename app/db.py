@@ -1,8 +1,21 @@
+import hashlib
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
 import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 from dotenv import load_dotenv
 import logging
 
+from app.cache import CACHE_BACKEND, ReadThroughCache, create_backend
+from app.metrics import registry
+
 load_dotenv()
 
 POSTGRES_HOST = os.getenv("POSTGRES_HOST")
@@ -10,48 +23,465 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 
+# Connection pool settings
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", "1"))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "5"))
+# Idle connections older than this are pinged with `SELECT 1` before being handed out
+POSTGRES_POOL_HEALTH_CHECK_AFTER = float(os.getenv("POSTGRES_POOL_HEALTH_CHECK_AFTER", "30"))
+
+# Prepare each query server-side on first use per connection and send only its name and
+# parameters afterwards. Disable behind poolers that do not keep sessions (e.g. PgBouncer in
+# transaction mode).
+POSTGRES_PREPARED_STATEMENTS = os.getenv("POSTGRES_PREPARED_STATEMENTS", "true").lower() == "true"
+
+# How long a resolved user_id -> employee_id mapping is trusted, in seconds
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "3600"))
+# Mappings kept in memory, and the most loaded by `preload_employee_ids`
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """Raised when no connection becomes available within the pool's wait timeout."""
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """A psycopg2 connection that remembers which statements are prepared on its session."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def _connect():
+    """
+    Opens a new PostgreSQL connection using the environment settings.
+
+    The connection is in autocommit mode: each statement is its own transaction, so
+    single-statement calls need no separate COMMIT round-trip.
+    """
+    conn = psycopg2.connect(
+        host=POSTGRES_HOST,
+        database=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        connection_factory=PreparingConnection,
+    )
+    conn.autocommit = True
+    return conn
+
+
+_STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def statement_name(query):
+    """
+    Returns a short, low-cardinality tag for a SQL statement: its verb and first table,
+    e.g. "select leave_balances". Used as the `statement` label of query metrics.
+    """
+    words = query.split(None, 1)
+    if not words:
+        return "unknown"
+    match = _STATEMENT_TABLE.search(query)
+    return f"{words[0].lower()} {match.group(1).lower()}" if match else words[0].lower()
+
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+@lru_cache(maxsize=256)
+def prepared_statement(query):
+    """
+    Returns the registry entry of a query: the name it is prepared under, and its PREPARE
+    and EXECUTE commands. Names are derived from the query text, so every connection
+    prepares a given query under the same name.
+
+    Returns:
+        tuple: (name, prepare_sql, execute_sql); `execute_sql` takes the query's parameters.
+    """
+    name = "hr_" + hashlib.sha1(query.encode()).hexdigest()[:16]
+    count = 0
+
+    def number(_):
+        nonlocal count
+        count += 1
+        return f"${count}"
+
+    prepare_sql = f"PREPARE {name} AS {_PLACEHOLDER.sub(number, query.strip().rstrip(';'))}"
+    execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * count)})" if count else f"EXECUTE {name}"
+    return name, prepare_sql, execute_sql
+
+
+def _execute(conn, cur, query, params):
+    """
+    Runs a query on `cur`, as a prepared statement when the connection tracks them
+    (`PreparingConnection`). The first use on a connection costs one extra PREPARE.
+    """
+    prepared = getattr(conn, "prepared", None)
+    if prepared is None or not POSTGRES_PREPARED_STATEMENTS or isinstance(params, dict):
+        cur.execute(query, params)
+        return
+    name, prepare_sql, execute_sql = prepared_statement(query)
+    if name not in prepared:
+        cur.execute(prepare_sql)
+        prepared.add(name)
+    try:
+        cur.execute(execute_sql, params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        # Deallocated behind our back (e.g. DISCARD ALL or a rolled back PREPARE); prepare again
+        conn.rollback()
+        cur.execute(prepare_sql)
+        cur.execute(execute_sql, params)
+
+
+class ConnectionPool:
+    """
+    A thread-safe, bounded pool of database connections.
+
+    Connections are health-checked on checkout, callers wait up to `timeout` seconds
+    when all `maxconn` connections are in use, and usage is published to the metrics registry.
+
+    Args:
+        connect (callable, optional): Factory returning a new DB-API connection. Defaults to a
+            psycopg2 connection built from the POSTGRES_* settings; pass a stand-in for tests.
+        minconn (int): Number of connections opened eagerly and kept idle.
+        maxconn (int): Maximum number of connections open at the same time.
+        timeout (float): Seconds to wait for a free connection before raising `PoolTimeout`.
+        health_check_after (float): Idle seconds after which a connection is pinged on checkout.
+    """
+
+    def __init__(self, connect=None, minconn=POSTGRES_POOL_MIN, maxconn=POSTGRES_POOL_MAX,
+                 timeout=POSTGRES_POOL_TIMEOUT, health_check_after=POSTGRES_POOL_HEALTH_CHECK_AFTER):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool sizes must satisfy 0 <= minconn <= maxconn and maxconn >= 1")
+        self._connect = connect or _connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned_at)
+        self._in_use = set()
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._checkout_times = deque()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._health_check_failures = 0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def getconn(self):
+        """
+        Borrows a healthy connection from the pool.
+
+        Returns:
+            A database connection. It must be handed back with `putconn`.
+
+        Raises:
+            PoolTimeout: If no connection became available within `timeout` seconds.
+            psycopg2.pool.PoolError: If the pool has been closed.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                conn, returned_at = self._reserve(deadline)
+            if conn is None:
+                # A slot was reserved for a brand-new connection; open it outside the lock
+                try:
+                    with registry.timer("db_connect_seconds"):
+                        conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                    self._in_use.add(conn)
+            elif not self._is_healthy(conn, returned_at):
+                with self._cond:
+                    self._health_check_failures += 1
+                registry.inc("db_pool_health_check_failures_total")
+                self._discard(conn)
+                continue
+            self._record_checkout(time.monotonic() - started)
+            return conn
+
+    def _reserve(self, deadline):
+        """Picks an idle connection or a slot for a new one; must be called with the lock held."""
+        if self._closed:
+            raise psycopg2.pool.PoolError("connection pool is closed")
+        self._waiting += 1
+        try:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(conn)
+                    return conn, returned_at
+                if len(self._in_use) + self._opening < self.maxconn:
+                    self._opening += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    registry.inc("db_pool_timeouts_total")
+                    raise PoolTimeout(f"no connection available within {self.timeout}s")
+                self._cond.wait(remaining)
+                if self._closed:
+                    raise psycopg2.pool.PoolError("connection pool is closed")
+        finally:
+            self._waiting -= 1
+
+    def _is_healthy(self, conn, returned_at):
+        if getattr(conn, "closed", 0):
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1;")
+            finally:
+                cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _record_checkout(self, waited):
+        now = time.monotonic()
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_times.append(now)
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            in_use = len(self._in_use)
+        registry.inc("db_pool_checkouts_total")
+        registry.histogram("db_pool_wait_seconds", waited)
+        registry.set_gauge("db_pool_in_use", in_use)
+
+    def putconn(self, conn, discard=False):
+        """
+        Returns a borrowed connection to the pool.
+
+        Any open transaction is rolled back. Broken connections, or ones passed with
+        `discard=True`, are closed instead of being reused.
+        """
+        if not discard and not getattr(conn, "closed", 0):
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except AttributeError:
+                pass  # Not a psycopg2 connection (e.g. a stand-in used in tests)
+            except Exception:
+                discard = True
+        else:
+            discard = True
+
+        if discard:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._in_use.discard(conn)
+            if self._closed:
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            in_use = len(self._in_use)
+            self._cond.notify()
+        registry.set_gauge("db_pool_in_use", in_use)
+
+    def _discard(self, conn):
+        with self._cond:
+            self._in_use.discard(conn)
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection and always returns it."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Closes idle connections and refuses new checkouts; borrowed ones close when returned."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """
+        Returns a snapshot of pool usage.
+
+        Returns:
+            dict: Pool sizes, `in_use`, `idle`, `waiting`, `checkouts_total`, `checkouts_per_second`
+            (over the last 60 seconds), wait time totals and failure counters.
+        """
+        now = time.monotonic()
+        with self._cond:
+            while self._checkout_times and now - self._checkout_times[0] > 60:
+                self._checkout_times.popleft()
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts_total": self._checkouts,
+                "checkouts_per_second": len(self._checkout_times) / 60.0,
+                "wait_seconds_total": self._wait_total,
+                "wait_seconds_max": self._wait_max,
+                "wait_seconds_avg": self._wait_total / self._checkouts if self._checkouts else 0.0,
+                "timeouts_total": self._timeouts,
+                "health_check_failures_total": self._health_check_failures,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the process-wide connection pool, creating it on first use.
+
+    Returns:
+        ConnectionPool: The shared pool.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def configure_pool(connect=None, **kwargs):
+    """
+    Replaces the process-wide pool, e.g. to point it at a local Postgres or a stand-in.
+
+    Args:
+        connect (callable, optional): Connection factory passed to `ConnectionPool`.
+        **kwargs: Any other `ConnectionPool` argument (minconn, maxconn, timeout, ...).
+
+    Returns:
+        ConnectionPool: The new shared pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+        _pool = ConnectionPool(connect=connect, **kwargs)
+    return _pool
+
+
+def pool_stats():
+    """Returns the shared pool's usage snapshot (see `ConnectionPool.stats`)."""
+    return get_pool().stats()
+
+
 def connect_to_db():
     """
-    Establishes a connection to the PostgreSQL database.
+    Borrows a connection from the shared connection pool.
+
+    The connection must be handed back with `release_connection` rather than closed.
 
     Returns:
         psycopg2.extensions.connection: A database connection object, or None on failure.
     """
     try:
-        conn = psycopg2.connect(
-            host=POSTGRES_HOST,
-            database=POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD
-        )
-        return conn
+        return get_pool().getconn()
     except psycopg2.Error as e:
+        logger.warning("Could not get a database connection: %s", e)
         return None
 
+
+def release_connection(conn):
+    """
+    Returns a connection obtained from `connect_to_db` to the shared pool.
+
+    Args:
+        conn (psycopg2.extensions.connection): The database connection object.
+    """
+    if conn is not None:
+        get_pool().putconn(conn)
+
+
+@contextmanager
+def get_connection():
+    """
+    Context manager around `connect_to_db` / `release_connection`.
+
+    Yields:
+        psycopg2.extensions.connection: A pooled connection, or None on failure.
+    """
+    conn = connect_to_db()
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
 def execute_query(conn, query, params=None):
     """
     Executes a SQL query against the database.
 
     Args:
         conn (psycopg2.extensions.connection): The database connection object.
-        query (str): The SQL query to execute.
+        query (str): The SQL query to execute. Queries with positional parameters are
+            prepared on the connection on first use (see `prepared_statement`).
         params (tuple or dict, optional): Parameters for the query (to prevent SQL injection). Defaults to None.
 
     Returns:
         list: A list of tuples representing the query results, or None on error.
     """
+    statement = statement_name(query)
     try:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            conn.commit() # Commit changes for INSERT, UPDATE, DELETE
+        with registry.timer("db_query_seconds", statement=statement), conn.cursor() as cur:
+            _execute(conn, cur, query, params)
+            if not statement.startswith("select"):
+                conn.commit() # Commit changes for INSERT, UPDATE, DELETE; reads have nothing to commit
             if cur.description: # Check if the query returns data (e.g., SELECT)
                 return cur.fetchall()
             else:
                 return None
     except psycopg2.Error as e:
+        registry.inc("db_query_errors_total", statement=statement)
         conn.rollback() # Rollback changes in case of error
         return None
 
+USER_LEAVE_BALANCE_QUERY = """
+    SELECT lt.leave_type_name, lb.available_days, lb.used_days
+    FROM leave_balances lb
+    JOIN employees e ON lb.employee_id = e.employee_id
+    JOIN leave_types lt ON lb.leave_type_id = lt.leave_type_id
+    WHERE e.user_id = %s;
+"""
+
 def fetch_user_leave_balance(conn, user_id):
     """
     Retrieves the leave balance for a specific user.
@@ -63,14 +493,12 @@ def fetch_user_leave_balance(conn, user_id):
     Returns:
         list: A list of tuples representing the leave balances for the user, or None if there is an error.
     """
-    query = """
-        SELECT lt.leave_type_name, lb.available_days, lb.used_days
-        FROM leave_balances lb
-        JOIN employees e ON lb.employee_id = e.employee_id
-        JOIN leave_types lt ON lb.leave_type_id = lt.leave_type_id
-        WHERE e.user_id = %s;
-    """
-    return execute_query(conn, query, (user_id,))
+    return execute_query(conn, USER_LEAVE_BALANCE_QUERY, (user_id,))
+
+CREATE_LEAVE_REQUEST_QUERY = """
+    INSERT INTO leave_requests (employee_id, leave_type_id, start_date, end_date, days_requested, reason, status, request_date)
+    VALUES (%s, %s, %s, %s, %s, %s, 'Pending', NOW());
+"""
 
 def create_leave_request(conn, employee_id, leave_type_id, start_date, end_date, days_requested, reason):
     """
@@ -88,12 +516,19 @@ def create_leave_request(conn, employee_id, leave_type_id, start_date, end_date,
     Returns:
         bool: True if the request was successfully created, False otherwise.
     """
-    query = """
-        INSERT INTO leave_requests (employee_id, leave_type_id, start_date, end_date, days_requested, reason, status, request_date)
-        VALUES (%s, %s, %s, %s, %s, %s, 'Pending', NOW());
-    """
-    result = execute_query(conn, query, (employee_id, leave_type_id, start_date, end_date, days_requested, reason))
-    return result is None
+    result = execute_query(conn, CREATE_LEAVE_REQUEST_QUERY, (employee_id, leave_type_id, start_date, end_date, days_requested, reason))
+    if result is None:
+        invalidate_employee_cache(employee_id)
+        return True
+    return False
+
+LEAVE_REQUESTS_QUERY = """
+    SELECT lr.leave_request_id, lt.leave_type_name, lr.start_date, lr.end_date, lr.days_requested, lr.reason, lr.status, lr.request_date
+    FROM leave_requests lr
+    JOIN leave_types lt ON lr.leave_type_id = lt.leave_type_id
+    WHERE lr.employee_id = %s
+    ORDER BY lr.request_date DESC;
+"""
 
 def fetch_leave_requests(conn, employee_id):
     """
@@ -106,11 +541,432 @@ def fetch_leave_requests(conn, employee_id):
     Returns:
         list: A list of tuples representing the leave requests, or None if there is an error.
     """
-    query = """
-        SELECT lr.leave_request_id, lt.leave_type_name, lr.start_date, lr.end_date, lr.days_requested, lr.reason, lr.status, lr.request_date
+    return execute_query(conn, LEAVE_REQUESTS_QUERY, (employee_id,))
+
+# Shared with app.async_db
+EMPLOYEE_ID_QUERY = "SELECT employee_id FROM employees WHERE user_id = %s;"
+
+def fetch_employee_id(conn, user_id):
+    """
+    Looks up the employee ID of a user.
+
+    Args:
+        conn: The database connection.
+        user_id: The user's Azure AD ID.
+
+    Returns:
+        The employee's ID, or None if the user is unknown or there is an error.
+    """
+    result = execute_query(conn, EMPLOYEE_ID_QUERY, (user_id,))
+    if not result:
+        return None
+    return result[0][0]
+
+def fetch_all_employee_ids(conn, limit=None):
+    """
+    Retrieves the employee ID of every user.
+
+    Args:
+        conn: The database connection.
+        limit (int, optional): Maximum number of users returned. Defaults to all.
+
+    Returns:
+        list: A list of (user_id, employee_id) tuples, or None if there is an error.
+    """
+    query = "SELECT user_id, employee_id FROM employees WHERE user_id IS NOT NULL"
+    if limit is None:
+        return execute_query(conn, query + ";")
+    return execute_query(conn, query + " LIMIT %s;", (limit,))
+
+# Shared with app.async_db
+EMPLOYEE_LEAVE_BALANCE_QUERY = """
+    SELECT lt.leave_type_name, lb.available_days, lb.used_days
+    FROM leave_balances lb
+    JOIN leave_types lt ON lb.leave_type_id = lt.leave_type_id
+    WHERE lb.employee_id = %s;
+"""
+
+def fetch_employee_leave_balance(conn, employee_id):
+    """
+    Retrieves the leave balance of an employee whose ID is already resolved.
+
+    Args:
+        conn: The database connection.
+        employee_id: The employee's ID.
+
+    Returns:
+        list: A list of tuples (leave_type_name, available_days, used_days), or None if there is an error.
+    """
+    return execute_query(conn, EMPLOYEE_LEAVE_BALANCE_QUERY, (employee_id,))
+
+# Shared with app.async_db
+PENDING_LEAVE_REQUESTS_QUERY = """
+    SELECT lt.leave_type_name, lr.start_date, lr.end_date, lr.days_requested, lr.reason, lr.request_date
+    FROM leave_requests lr
+    JOIN leave_types lt ON lr.leave_type_id = lt.leave_type_id
+    WHERE lr.employee_id = %s AND lr.status = 'Pending'
+    ORDER BY lr.start_date;
+"""
+
+def fetch_pending_leave_requests(conn, employee_id):
+    """
+    Retrieves the pending leave requests of a specific employee.
+
+    Args:
+        conn: The database connection.
+        employee_id: The employee's ID.
+
+    Returns:
+        list: A list of tuples (leave_type_name, start_date, end_date, days_requested, reason, request_date),
+        or None if there is an error.
+    """
+    return execute_query(conn, PENDING_LEAVE_REQUESTS_QUERY, (employee_id,))
+
+# Shared with app.async_db. Resolves the employee and checks the leave type in the same
+# statement; no row is inserted if either is unknown. Parameters in the select list are
+# cast, since a prepared or server-bound statement cannot infer their types.
+CREATE_USER_LEAVE_REQUEST_QUERY = """
+    INSERT INTO leave_requests (employee_id, leave_type_id, start_date, end_date, days_requested, reason, status, request_date)
+    SELECT e.employee_id, lt.leave_type_id, %s::date, %s::date, %s::numeric, %s::text, 'Pending', NOW()
+    FROM employees e
+    JOIN leave_types lt ON lt.leave_type_id = %s
+    WHERE e.user_id = %s
+    RETURNING employee_id;
+"""
+
+def create_user_leave_request(conn, user_id, leave_type_id, start_date, end_date, days_requested, reason):
+    """
+    Inserts a new leave request for a user in a single statement, without resolving the
+    employee ID first.
+
+    Args:
+        conn: The database connection.
+        user_id: The user's Azure AD ID.
+        leave_type_id: The ID of the leave type.
+        start_date: The start date of the leave (YYYY-MM-DD).
+        end_date: The end date of the leave (YYYY-MM-DD).
+        days_requested: The number of days requested.
+        reason: The reason for the leave request.
+
+    Returns:
+        The employee's ID if the request was created, or None if the user or leave type is
+        unknown or there is an error.
+    """
+    result = execute_query(
+        conn, CREATE_USER_LEAVE_REQUEST_QUERY,
+        (start_date, end_date, days_requested, reason, leave_type_id, user_id),
+    )
+    if not result:
+        return None
+    employee_id = result[0][0]
+    invalidate_employee_cache(employee_id)
+    return employee_id
+
+# Shared with app.async_db. Taken before CREATE_USER_LEAVE_REQUESTS_QUERY in the same
+# transaction, so concurrent batches of an employee are checked one after the other
+LOCK_EMPLOYEE_QUERY = "SELECT employee_id FROM employees WHERE user_id = %(user_id)s FOR UPDATE;"
+
+# Shared with app.async_db. Validates a batch of leave requests of a user and inserts the
+# valid ones, returning one row per item in input order:
+# (item, status, leave_request_id, employee_id, remaining_days). An item is rejected if
+# the user or leave type is unknown, or if it overlaps an active request. The others are
+# then walked in order: an item is accepted unless it overlaps an item accepted before it,
+# or needs more days than its leave type has left, `remaining_days` (available - used -
+# pending days - days of the accepted items before it). Rejected items take neither
+# dates nor days from the items after them.
+CREATE_USER_LEAVE_REQUESTS_QUERY = """
+    WITH RECURSIVE employee AS (
+        SELECT employee_id FROM employees WHERE user_id = %(user_id)s
+    ),
+    items AS (
+        SELECT * FROM unnest(
+            %(leave_type_ids)s::integer[], %(start_dates)s::date[], %(end_dates)s::date[],
+            %(days_requested)s::numeric[], %(reasons)s::text[]
+        ) WITH ORDINALITY AS i (leave_type_id, start_date, end_date, days_requested, reason, item)
+    ),
+    checked AS (
+        SELECT it.*, e.employee_id,
+               COALESCE(lb.available_days - lb.used_days, 0) - COALESCE((
+                   SELECT SUM(lr.days_requested) FROM leave_requests lr
+                   WHERE lr.employee_id = e.employee_id AND lr.leave_type_id = it.leave_type_id
+                     AND lr.status = 'Pending'
+               ), 0) AS balance_days,
+               CASE
+                   WHEN e.employee_id IS NULL THEN 'unknown_employee'
+                   WHEN lt.leave_type_id IS NULL THEN 'unknown_leave_type'
+                   WHEN EXISTS (
+                       SELECT 1 FROM leave_requests lr
+                       WHERE lr.employee_id = e.employee_id AND lr.status IN ('Pending', 'Approved')
+                         AND lr.start_date <= it.end_date AND lr.end_date >= it.start_date
+                   ) THEN 'overlaps_existing'
+               END AS problem
+        FROM items it
+        LEFT JOIN employee e ON TRUE
+        LEFT JOIN leave_types lt ON lt.leave_type_id = it.leave_type_id
+        LEFT JOIN leave_balances lb ON lb.employee_id = e.employee_id AND lb.leave_type_id = it.leave_type_id
+    ),
+    -- One row per item, in order, carrying the date ranges and the days per leave type
+    -- accepted so far
+    walk AS (
+        SELECT CAST(0 AS BIGINT) AS item, CAST(NULL AS TEXT) AS outcome, CAST(NULL AS NUMERIC) AS remaining_days,
+               CAST('{}' AS daterange[]) AS taken, CAST('{}' AS jsonb) AS used
+        UNION ALL
+        SELECT c.item, o.outcome, c.balance_days - before.used_days,
+               CASE WHEN o.outcome IS NULL THEN w.taken || daterange(c.start_date, c.end_date, '[]') ELSE w.taken END,
+               CASE WHEN o.outcome IS NULL
+                    THEN w.used || jsonb_build_object(c.leave_type_id::text, before.used_days + c.days_requested)
+                    ELSE w.used END
+        FROM walk w
+        JOIN checked c ON c.item = w.item + 1
+        CROSS JOIN LATERAL (
+            SELECT COALESCE((w.used ->> c.leave_type_id::text)::numeric, 0) AS used_days
+        ) before
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(c.problem, CASE
+                       WHEN daterange(c.start_date, c.end_date, '[]') && ANY (w.taken) THEN 'overlaps_batch'
+                       WHEN before.used_days + c.days_requested > c.balance_days THEN 'insufficient_balance'
+                   END) AS outcome
+        ) o
+    ),
+    decided AS (
+        SELECT c.*, w.outcome, w.remaining_days
+        FROM checked c
+        JOIN walk w ON w.item = c.item
+    ),
+    inserted AS (
+        INSERT INTO leave_requests (employee_id, leave_type_id, start_date, end_date, days_requested, reason, status, request_date)
+        SELECT employee_id, leave_type_id, start_date, end_date, days_requested, reason, 'Pending', NOW()
+        FROM decided
+        WHERE outcome IS NULL
+        RETURNING leave_request_id, start_date, end_date
+    )
+    SELECT d.item, COALESCE(d.outcome, 'submitted'), ins.leave_request_id, d.employee_id, d.remaining_days
+    FROM decided d
+    -- Submitted items do not overlap each other, so their dates identify their rows
+    LEFT JOIN inserted ins ON d.outcome IS NULL AND ins.start_date = d.start_date AND ins.end_date = d.end_date
+    ORDER BY d.item;
+"""
+
+# `statement` label of the batch in query metrics; statement_name would tag it "with employees"
+LEAVE_BATCH_STATEMENT = "insert leave_requests batch"
+
+# Most leave requests accepted in one batch
+LEAVE_BATCH_MAX_ITEMS = int(os.getenv("LEAVE_BATCH_MAX_ITEMS", "50"))
+
+def leave_batch_params(user_id, requests):
+    """Returns the parameters of CREATE_USER_LEAVE_REQUESTS_QUERY for `create_user_leave_requests`."""
+    leave_type_ids, start_dates, end_dates, days_requested, reasons = (list(column) for column in zip(*requests))
+    return {
+        "user_id": user_id,
+        "leave_type_ids": leave_type_ids,
+        "start_dates": start_dates,
+        "end_dates": end_dates,
+        "days_requested": days_requested,
+        "reasons": reasons,
+    }
+
+def leave_batch_results(rows):
+    """
+    Turns the rows of CREATE_USER_LEAVE_REQUESTS_QUERY into the per-item results of
+    `create_user_leave_requests`, and drops the cached reads of the employee if any
+    request was submitted.
+    """
+    submitted = {employee_id for _, status, _, employee_id, _ in rows if status == "submitted"}
+    for employee_id in submitted:
+        invalidate_employee_cache(employee_id)
+    return [(status, leave_request_id, remaining_days) for _, status, leave_request_id, _, remaining_days in rows]
+
+def create_user_leave_requests(conn, user_id, requests):
+    """
+    Validates and inserts several leave requests of a user in one transaction and one
+    round-trip: the employee row is locked, then every request is checked, in order,
+    against the balance, the user's active requests and the requests of the batch accepted
+    before it, and the valid ones are inserted with one multi-row INSERT.
+
+    Args:
+        conn: The database connection.
+        user_id: The user's Azure AD ID.
+        requests (list): (leave_type_id, start_date, end_date, days_requested, reason) tuples,
+            `days_requested` being the working days of the range.
+
+    Returns:
+        list: One (status, leave_request_id, remaining_days) tuple per request, in order.
+        `status` is "submitted" or the reason of the rejection (see
+        CREATE_USER_LEAVE_REQUESTS_QUERY); `leave_request_id` is None unless submitted;
+        `remaining_days` is what the leave type had left when the request was checked.
+        None if there is an error.
+    """
+    if not requests:
+        return []
+    statement = LEAVE_BATCH_STATEMENT
+    try:
+        with registry.timer("db_query_seconds", statement=statement), conn.cursor() as cur:
+            # Both statements go out in one message, which Postgres runs as one implicit
+            # transaction on an autocommit connection; the result is the batch's
+            cur.execute(LOCK_EMPLOYEE_QUERY + CREATE_USER_LEAVE_REQUESTS_QUERY, leave_batch_params(user_id, requests))
+            rows = cur.fetchall()
+        if not getattr(conn, "autocommit", False):
+            conn.commit()
+    except psycopg2.Error as e:
+        logger.warning("Leave request batch failed: %s", e)
+        registry.inc("db_query_errors_total", statement=statement)
+        conn.rollback()
+        return None
+    return leave_batch_results(rows)
+
+# Shared with app.async_db. Balance, pending requests and the latest decided requests of an
+# employee in one round-trip; the `section` column tells the row kinds apart. NULLs in the
+# derived table are cast, as Postgres would otherwise type them as text.
+LEAVE_DASHBOARD_QUERY = """
+    SELECT 'balance' AS section, lt.leave_type_name, lb.available_days, lb.used_days,
+           CAST(NULL AS DATE) AS start_date, CAST(NULL AS DATE) AS end_date,
+           CAST(NULL AS NUMERIC) AS days_requested, CAST(NULL AS TEXT) AS reason,
+           CAST(NULL AS TEXT) AS status, CAST(NULL AS TIMESTAMP) AS request_date
+    FROM leave_balances lb
+    JOIN leave_types lt ON lb.leave_type_id = lt.leave_type_id
+    WHERE lb.employee_id = %s
+    UNION ALL
+    SELECT 'pending', lt.leave_type_name, NULL, NULL,
+           lr.start_date, lr.end_date, lr.days_requested, lr.reason, lr.status, lr.request_date
+    FROM leave_requests lr
+    JOIN leave_types lt ON lr.leave_type_id = lt.leave_type_id
+    WHERE lr.employee_id = %s AND lr.status = 'Pending'
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'recent', lt.leave_type_name, CAST(NULL AS NUMERIC), CAST(NULL AS NUMERIC),
+               lr.start_date, lr.end_date, lr.days_requested, lr.reason, lr.status, lr.request_date
         FROM leave_requests lr
         JOIN leave_types lt ON lr.leave_type_id = lt.leave_type_id
-        WHERE lr.employee_id = %s
-        ORDER BY lr.request_date DESC;
+        WHERE lr.employee_id = %s AND lr.status <> 'Pending'
+        ORDER BY lr.request_date DESC
+        LIMIT %s
+    ) recent;
+"""
+
+# Number of decided requests shown in the leave dashboard
+LEAVE_DASHBOARD_RECENT_LIMIT = 5
+
+def fetch_leave_dashboard(conn, employee_id, recent_limit=LEAVE_DASHBOARD_RECENT_LIMIT):
+    """
+    Retrieves an employee's leave balance, pending requests and most recent decided requests
+    in one query.
+
+    Args:
+        conn: The database connection.
+        employee_id: The employee's ID.
+        recent_limit (int): Maximum number of decided requests returned.
+
+    Returns:
+        list: A list of tuples (section, leave_type_name, available_days, used_days, start_date,
+        end_date, days_requested, reason, status, request_date), where section is "balance",
+        "pending" or "recent", or None if there is an error.
+    """
+    return execute_query(conn, LEAVE_DASHBOARD_QUERY, (employee_id, employee_id, employee_id, recent_limit))
+
+# Read-through caches in front of the per-employee read queries
+leave_balance_cache = ReadThroughCache("leave_balance")
+pending_requests_cache = ReadThroughCache("pending_requests")
+leave_dashboard_cache = ReadThroughCache("leave_dashboard")
+
+# Azure AD user_id -> employee_id mapping, which almost never changes. In memory it has its
+# own size limit, so a preload of all employees does not crowd out the other caches.
+if CACHE_BACKEND.lower() == "memory":
+    _identity_backend = create_backend("memory", maxsize=IDENTITY_CACHE_MAX_ENTRIES, ttl=IDENTITY_CACHE_TTL)
+else:
+    _identity_backend = create_backend()
+employee_id_cache = ReadThroughCache("employee_id", backend=_identity_backend, ttl=IDENTITY_CACHE_TTL)
+
+def _load_with_connection(fetch, *args):
+    with get_connection() as conn:
+        if conn is None:
+            return None
+        return fetch(conn, *args)
+
+def resolve_employee_id(user_id):
+    """
+    Resolves a user's Azure AD ID to their employee ID, from the cache when possible.
+
+    Args:
+        user_id: The user's Azure AD ID.
+
+    Returns:
+        The employee's ID, or None if the user is unknown or the database could not be queried.
+    """
+    if not user_id:
+        return None
+    return employee_id_cache.get_or_load(
+        user_id, lambda: _load_with_connection(fetch_employee_id, user_id)
+    )
+
+def preload_employee_ids(limit=IDENTITY_CACHE_MAX_ENTRIES):
+    """
+    Warms the identity cache with the employee IDs of up to `limit` users in one query.
+
+    Returns:
+        int: The number of mappings loaded, or None if the database could not be queried.
+    """
+    rows = _load_with_connection(fetch_all_employee_ids, limit)
+    if rows is None:
+        return None
+    for user_id, employee_id in rows:
+        employee_id_cache.put(user_id, employee_id)
+    return len(rows)
+
+def get_leave_balance(employee_id):
+    """
+    Returns the leave balance of an employee, from the cache when possible.
+
+    A pooled connection is only borrowed on a cache miss.
+
+    Args:
+        employee_id: The employee's ID.
+
+    Returns:
+        list: See `fetch_employee_leave_balance`; None if the database could not be queried.
+    """
+    return leave_balance_cache.get_or_load(
+        employee_id, lambda: _load_with_connection(fetch_employee_leave_balance, employee_id)
+    )
+
+def get_pending_leave_requests(employee_id):
+    """
+    Returns the pending leave requests of an employee, from the cache when possible.
+
+    A pooled connection is only borrowed on a cache miss.
+
+    Args:
+        employee_id: The employee's ID.
+
+    Returns:
+        list: See `fetch_pending_leave_requests`; None if the database could not be queried.
+    """
+    return pending_requests_cache.get_or_load(
+        employee_id, lambda: _load_with_connection(fetch_pending_leave_requests, employee_id)
+    )
+
+def get_leave_dashboard(employee_id):
+    """
+    Returns the leave dashboard of an employee, from the cache when possible.
+
+    A pooled connection is only borrowed on a cache miss.
+
+    Args:
+        employee_id: The employee's ID.
+
+    Returns:
+        list: See `fetch_leave_dashboard`; None if the database could not be queried.
+    """
+    return leave_dashboard_cache.get_or_load(
+        employee_id, lambda: _load_with_connection(fetch_leave_dashboard, employee_id)
+    )
+
+def invalidate_employee_cache(employee_id):
+    """
+    Drops every cached read for an employee. Called after writes for that employee.
+
+    Args:
+        employee_id: The employee's ID.
     """
-    return execute_query(conn, query, (employee_id,))
\ No newline at end of file
+    pending_requests_cache.invalidate(employee_id)
+    leave_balance_cache.invalidate(employee_id)
+    leave_dashboard_cache.invalidate(employee_id)
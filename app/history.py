@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+
+from app.clients import get_chat_llm
+from app.metrics import registry
+from app.streaming import message_text
+
+load_dotenv()
+
+# Estimated tokens of conversation history above which older turns are summarized
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+# Estimated tokens of the most recent turns kept verbatim when summarizing
+HISTORY_WINDOW_TOKENS = int(os.getenv("HISTORY_WINDOW_TOKENS", "3000"))
+HISTORY_SUMMARY_MAX_WORDS = int(os.getenv("HISTORY_SUMMARY_MAX_WORDS", "200"))
+
+logger = logging.getLogger(__name__)
+
+# Fixed per-message cost of roles and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below between an HR leave assistant and an employee. "
+    "Keep leave types, dates, numbers of days, the outcome of leave requests and any open questions. "
+    "Write in the language of the conversation, in at most {max_words} words."
+)
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of tokens of `text` without a tokenizer.
+
+    Counts about four UTF-8 bytes per token, which is close for English and conservative
+    for Thai (three bytes per character).
+    """
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def message_tokens(message):
+    """Estimates the tokens a message adds to the model input, tool calls included."""
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message_text(message))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(tool_call["name"] + json.dumps(tool_call["args"], ensure_ascii=False))
+    return tokens
+
+
+def count_tokens(messages):
+    """Estimates the tokens of a list of messages."""
+    return sum(message_tokens(message) for message in messages)
+
+
+def window_start(messages, budget):
+    """
+    Returns the index of the first message of the most recent turns that fit in `budget`.
+
+    The window always starts at a user message, so that tool calls stay with their results
+    and the model input opens with a user turn. The latest user turn is always kept, even
+    when it alone exceeds the budget.
+    """
+    start = len(messages)
+    used = 0
+    for index in range(len(messages) - 1, -1, -1):
+        used += message_tokens(messages[index])
+        if isinstance(messages[index], HumanMessage):
+            if used > budget and start < len(messages):
+                break
+            start = index
+    if start == len(messages):
+        # No user message at all: keep everything rather than send a headless window
+        return 0
+    return start
+
+
+def window(messages, budget=HISTORY_TOKEN_BUDGET):
+    """Returns the most recent turns of `messages` that fit in `budget` (see `window_start`)."""
+    return messages[window_start(messages, budget):]
+
+
+def _transcript(messages):
+    lines = []
+    for message in messages:
+        text = message_text(message)
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {text}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool result ({message.name}): {text}")
+        elif isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                lines.append(f"Assistant called {tool_call['name']} with {json.dumps(tool_call['args'], ensure_ascii=False)}")
+            if text:
+                lines.append(f"Assistant: {text}")
+    return "\n".join(lines)
+
+
+class HistorySummarizer:
+    """
+    Graph node that compresses older turns into a running summary once the history
+    exceeds its token budget.
+
+    The summarized messages are removed from the state with `RemoveMessage`; the summary is
+    kept in the state's `summary` field and shown to the assistant with the turn context.
+    If the summary cannot be generated, the history is left as is and the assistant's
+    sliding window still bounds the model input.
+
+    Args:
+        llm (optional): Chat model used to write the summary. Defaults to the app's model
+            (`get_chat_llm`), created when the first summary is written.
+        budget (int): Estimated history tokens that trigger summarization.
+        keep_tokens (int): Estimated tokens of the most recent turns kept verbatim.
+    """
+
+    def __init__(self, llm=None, budget=HISTORY_TOKEN_BUDGET, keep_tokens=HISTORY_WINDOW_TOKENS):
+        self._llm = llm
+        self.budget = budget
+        self.keep_tokens = keep_tokens
+
+    @property
+    def llm(self):
+        return self._llm if self._llm is not None else get_chat_llm()
+
+    def _plan(self, state):
+        messages = state["messages"]
+        tokens = count_tokens(messages)
+        registry.observe("history_tokens", tokens)
+        if tokens <= self.budget:
+            return None
+        cut = window_start(messages, self.keep_tokens)
+        if cut == 0:
+            return None
+        return messages[:cut]
+
+    def _request(self, state, older):
+        transcript = _transcript(older)
+        if state.get("summary"):
+            transcript = f"Summary so far:\n{state['summary']}\n\nLater conversation:\n{transcript}"
+        return [
+            SystemMessage(content=SUMMARY_PROMPT.format(max_words=HISTORY_SUMMARY_MAX_WORDS)),
+            HumanMessage(content=transcript),
+        ]
+
+    @staticmethod
+    def _update(older, summary):
+        registry.inc("history_summaries_total")
+        registry.inc("history_summarized_messages_total", len(older))
+        return {
+            "summary": message_text(summary),
+            "messages": [RemoveMessage(id=message.id) for message in older],
+        }
+
+    def __call__(self, state):
+        older = self._plan(state)
+        if older is None:
+            return {}
+        try:
+            summary = self.llm.invoke(self._request(state, older))
+        except Exception as e:
+            logger.warning("History summarization failed: %s", e)
+            registry.inc("history_summary_failures_total")
+            return {}
+        return self._update(older, summary)
+
+    async def acall(self, state):
+        """Async version of `__call__`."""
+        older = self._plan(state)
+        if older is None:
+            return {}
+        try:
+            summary = await self.llm.ainvoke(self._request(state, older))
+        except Exception as e:
+            logger.warning("History summarization failed: %s", e)
+            registry.inc("history_summary_failures_total")
+            return {}
+        return self._update(older, summary)
@@ -0,0 +1,82 @@
+import bisect
+import logging
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Company holidays: a text file with one YYYY-MM-DD date per line, optionally followed by
+# the holiday's name. Blank lines and lines starting with "#" are ignored.
+HOLIDAY_CALENDAR_FILE = os.getenv("HOLIDAY_CALENDAR_FILE")
+# Working days of the week, Monday being 0
+WORKING_WEEKDAYS = frozenset(int(day) for day in os.getenv("WORKING_WEEKDAYS", "0,1,2,3,4").split(",") if day.strip())
+
+
+class HolidayCalendar:
+    """
+    Counts working days: the `working_weekdays` of a date range that are not holidays.
+
+    Holidays are sorted once on creation, so a count costs a few arithmetic operations
+    and two binary searches, however long the range.
+
+    Args:
+        holidays (iterable): Dates of the holidays.
+        working_weekdays (iterable): Working days of the week, Monday being 0.
+    """
+
+    def __init__(self, holidays=(), working_weekdays=WORKING_WEEKDAYS):
+        self.working_weekdays = frozenset(working_weekdays)
+        # Holidays falling on a weekend take no working day off
+        self._holidays = sorted({day for day in holidays if day.weekday() in self.working_weekdays})
+
+    @classmethod
+    def from_file(cls, path, working_weekdays=WORKING_WEEKDAYS):
+        """Loads a calendar from a holiday file (see HOLIDAY_CALENDAR_FILE)."""
+        holidays = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    holidays.append(date.fromisoformat(line.split(None, 1)[0]))
+        return cls(holidays, working_weekdays)
+
+    def is_working_day(self, day):
+        """Returns True if `day` is a working weekday and not a holiday."""
+        index = bisect.bisect_left(self._holidays, day)
+        return day.weekday() in self.working_weekdays and (index == len(self._holidays) or self._holidays[index] != day)
+
+    def working_days(self, start_date, end_date):
+        """
+        Returns the number of working days from `start_date` to `end_date`, both included.
+
+        Returns:
+            int: 0 if the range is empty or has no working day.
+        """
+        if end_date < start_date:
+            return 0
+        days = (end_date - start_date).days + 1
+        weeks, remainder = divmod(days, 7)
+        count = weeks * len(self.working_weekdays)
+        count += sum(1 for offset in range(remainder) if (start_date + timedelta(days=offset)).weekday() in self.working_weekdays)
+        holidays = bisect.bisect_right(self._holidays, end_date) - bisect.bisect_left(self._holidays, start_date)
+        return count - holidays
+
+
+@lru_cache(maxsize=1)
+def get_calendar():
+    """
+    Returns the process-wide holiday calendar, loaded from HOLIDAY_CALENDAR_FILE on first use.
+
+    Without a file, or if it cannot be read, only weekends are days off.
+    """
+    if HOLIDAY_CALENDAR_FILE:
+        try:
+            return HolidayCalendar.from_file(HOLIDAY_CALENDAR_FILE)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load the holiday calendar %s: %s", HOLIDAY_CALENDAR_FILE, e)
+    return HolidayCalendar()
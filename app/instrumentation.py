@@ -0,0 +1,69 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.metrics import registry
+
+
+class GraphMetricsCallback(BaseCallbackHandler):
+    """
+    Times the graph nodes, tools and LLM calls of a run into the metrics registry.
+
+    Pass it in the run config's `callbacks`, next to Langfuse. It records the histograms
+    `graph_node_seconds` (label `node`), `tool_seconds` (label `tool`) and `llm_seconds`
+    (label `node`), and counts failures as `graph_node_errors_total` and `tool_errors_total`.
+    Handlers run inline, so recording adds no thread hops.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}  # run_id -> (histogram name, labels, start time)
+
+    def _start(self, run_id, name, labels):
+        self._started[run_id] = (name, labels, time.perf_counter())
+
+    def _end(self, run_id, error_counter=None):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        name, labels, started_at = started
+        registry.histogram(name, time.perf_counter() - started_at, **labels)
+        if error_counter:
+            registry.inc(error_counter, **labels)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Runnables nested in a node share its metadata; time only the outermost run named after
+        # the node, and skip the graph's internal nodes (__start__)
+        if (node and kwargs.get("name") == node and not node.startswith("__")
+                and parent_run_id not in self._started):
+            self._start(run_id, "graph_node_seconds", {"node": node})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "graph_node_errors_total")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        tool = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        self._start(run_id, "tool_seconds", {"tool": tool})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "tool_errors_total")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm_seconds", {"node": (metadata or {}).get("langgraph_node", "none")})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm_seconds", {"node": (metadata or {}).get("langgraph_node", "none")})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "llm_errors_total")
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+import os
+import re
+import unicodedata
+import zlib
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from app.cache import CACHE_BACKEND, MISS, create_backend
+from app.metrics import registry
+from app.prompts import PROMPT_VERSION
+from app.streaming import message_text
+
+load_dotenv()
+
+# Reuse the assistant's final replies for repeated turns of the same user: same normalized
+# prompt, same tool results in the turn, same prompt version and conversation so far. Off by
+# default: a reused reply was written for that conversation, not for a fresh look at the data
+LLM_CACHE = os.getenv("LLM_CACHE", "false").lower() == "true"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# "memory" or "redis"; defaults to CACHE_BACKEND
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", CACHE_BACKEND)
+# Cosine similarity of the prompts' character trigram vectors at or above which a
+# differently worded prompt reuses a reply; 0 disables similarity matching
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+# Recent prompts per scope compared against on an exact-match miss
+LLM_CACHE_SIMILAR_CANDIDATES = int(os.getenv("LLM_CACHE_SIMILAR_CANDIDATES", "32"))
+
+_EMBEDDING_DIMENSIONS = 4096
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Case-folds a prompt and drops punctuation and repeated whitespace."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text)).strip()
+
+
+def embed(text):
+    """
+    Returns a unit-length hashed character trigram vector of `text`, as {dimension: weight}.
+
+    Needs no model and works for Thai, which has no spaces between words. CRC32 keeps the
+    vectors identical across processes, so they can be shared through Redis.
+    """
+    padded = f" {text} "
+    counts = {}
+    for i in range(max(1, len(padded) - 2)):
+        dimension = zlib.crc32(padded[i:i + 3].encode("utf-8")) % _EMBEDDING_DIMENSIONS
+        counts[dimension] = counts.get(dimension, 0) + 1
+    norm = math.sqrt(sum(count * count for count in counts.values()))
+    return {dimension: count / norm for dimension, count in counts.items()}
+
+
+def similarity(a, b):
+    """Cosine similarity of two vectors from `embed`."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(dimension, 0.0) for dimension, weight in a.items())
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Caches the assistant's final replies (no tool calls) for repeated turns.
+
+    Entries are scoped by user, prompt version, date, conversation summary, the messages
+    of the model's window before the user's message, and the tool calls and results of the
+    current turn, so personal data is never served to another user and replies formatted
+    from tool output are only reused for identical output and context. Within a scope, the
+    user's message must match after `normalize`, or, with `similarity` set, be close
+    enough by `embed`.
+
+    Hits and misses are published as `llm_cache_hits_total` (label `match`: "exact" or
+    "similar") and `llm_cache_misses_total`.
+
+    Args:
+        backend: Store with the `app.cache` backend interface. Defaults to one built from
+            the LLM_CACHE_* settings.
+        ttl (float): Time to live of the entries, in seconds.
+        similarity (float): Minimum similarity of a near match; 0 for exact matches only.
+        candidates (int): Recent prompts per scope kept for similarity matching.
+    """
+
+    def __init__(self, backend=None, ttl=LLM_CACHE_TTL, similarity=LLM_CACHE_SIMILARITY,
+                 candidates=LLM_CACHE_SIMILAR_CANDIDATES):
+        if backend is None:
+            if LLM_CACHE_BACKEND.lower() == "memory":
+                backend = create_backend("memory", maxsize=LLM_CACHE_MAX_ENTRIES, ttl=ttl)
+            else:
+                backend = create_backend(LLM_CACHE_BACKEND, ttl=ttl)
+        self.backend = backend
+        self.ttl = ttl
+        self.similarity = similarity
+        self.candidates = candidates
+
+    @staticmethod
+    def _keys(state):
+        """Returns (scope, normalized prompt) of the assistant call, or None if it cannot be cached."""
+        user_id = state.get("user_info")
+        messages = state["messages"]
+        last_human = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None)
+        if not user_id or last_human is None:
+            return None
+        # `messages` is the model's window: a reply is only reused with the same context
+        history = []
+        for message in messages[:last_human]:
+            calls = [(call["name"], call["args"]) for call in getattr(message, "tool_calls", None) or []]
+            history.append((message.type, message_text(message), calls))
+        turn = []
+        for message in messages[last_human + 1:]:
+            if isinstance(message, AIMessage):
+                turn.append([(call["name"], call["args"]) for call in message.tool_calls])
+            elif isinstance(message, ToolMessage):
+                turn.append(message_text(message))
+        scope = _digest([
+            PROMPT_VERSION, user_id, state.get("time", "")[:10], state.get("summary", ""), history, turn,
+        ])
+        return f"llm:{scope}", normalize(message_text(messages[last_human]))
+
+    def lookup(self, state):
+        """Returns the cached reply of an assistant call, or None."""
+        keys = self._keys(state)
+        if keys is None:
+            return None
+        scope, prompt = keys
+        match = "exact"
+        content = self.backend.get(f"{scope}:{_digest(prompt)}")
+        if content is MISS and self.similarity > 0:
+            match = "similar"
+            content = self._lookup_similar(scope, prompt)
+        if content is MISS:
+            registry.inc("llm_cache_misses_total")
+            return None
+        registry.inc("llm_cache_hits_total", match=match)
+        return AIMessage(content=content, response_metadata={"llm_cache": match})
+
+    def _lookup_similar(self, scope, prompt):
+        index = self.backend.get(f"{scope}:index")
+        if index is MISS:
+            return MISS
+        vector = embed(prompt)
+        score, key = max(((similarity(vector, candidate), key) for key, candidate in index), default=(0.0, None))
+        if score < self.similarity:
+            return MISS
+        return self.backend.get(f"{scope}:{key}")
+
+    def store(self, state, result):
+        """Caches `result` if it is a final reply with text."""
+        if not isinstance(result, AIMessage) or result.tool_calls or not message_text(result):
+            return
+        keys = self._keys(state)
+        if keys is None:
+            return
+        scope, prompt = keys
+        key = _digest(prompt)
+        # Only the content is kept; message IDs and usage belong to the original response
+        self.backend.set(f"{scope}:{key}", result.content, self.ttl)
+        if self.similarity > 0:
+            index = self.backend.get(f"{scope}:index")
+            index = [] if index is MISS else [entry for entry in index if entry[0] != key]
+            index.append((key, embed(prompt)))
+            self.backend.set(f"{scope}:index", index[-self.candidates:], self.ttl)
+
+    def wrap(self, runnable):
+        """Returns `runnable` behind this cache, with sync and async entry points."""
+
+        def invoke(state, config: RunnableConfig):
+            cached = self.lookup(state)
+            if cached is not None:
+                return cached
+            result = runnable.invoke(state, config)
+            self.store(state, result)
+            return result
+
+        async def ainvoke(state, config: RunnableConfig):
+            cached = self.lookup(state)
+            if cached is not None:
+                return cached
+            result = await runnable.ainvoke(state, config)
+            self.store(state, result)
+            return result
+
+        return RunnableLambda(invoke, afunc=ainvoke, name="response_cache")
+
+
+# Shared by the graphs of this process
+response_cache = ResponseCache()
@@ -0,0 +1,370 @@
+import asyncio
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Port of the Prometheus /metrics endpoint; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+# OTLP/HTTP metrics endpoint of an OpenTelemetry collector, e.g. http://localhost:4318/v1/metrics
+OTEL_METRICS_ENDPOINT = os.getenv("OTEL_METRICS_ENDPOINT", "")
+OTEL_EXPORT_INTERVAL = float(os.getenv("OTEL_EXPORT_INTERVAL", "15"))
+
+# Upper bounds, in seconds, of the default latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """
+    A small thread-safe, in-process store for counters, gauges, summaries and histograms.
+
+    Metric series are identified by a name plus an optional set of labels, e.g.
+    ``registry.inc("db_pool_checkouts_total")`` or
+    ``registry.histogram("db_query_seconds", 0.002, statement="select employees")``.
+    Recording takes one lock acquisition and no I/O, so it can stay on in production;
+    exporters read the registry when scraped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._summaries = {}
+        self._histograms = {}
+        self._listeners = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Increments a counter by `value`."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        for listener in self._listeners:
+            listener.inc(name, value, labels)
+
+    def set_gauge(self, name, value, **labels):
+        """Sets a gauge to `value`."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+        for listener in self._listeners:
+            listener.set_gauge(name, value, labels)
+
+    def observe(self, name, value, **labels):
+        """Records a single observation (e.g. a duration in seconds) into a summary."""
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = {"count": 0, "sum": 0.0, "max": 0.0}
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+        for listener in self._listeners:
+            listener.observe(name, value, labels)
+
+    def histogram(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Records an observation into a histogram with fixed bucket upper bounds.
+
+        The buckets of a series are set by its first observation.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "bounds": tuple(buckets), "counts": [0] * (len(buckets) + 1), "count": 0, "sum": 0.0,
+                }
+            histogram["counts"][bisect.bisect_left(histogram["bounds"], value)] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+        for listener in self._listeners:
+            listener.observe(name, value, labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the enclosed block into the `name` histogram, in seconds (errors included)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator that times every call of a function or coroutine function, like `timer`."""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_listener(self, listener):
+        """
+        Forwards every recorded value to `listener`, e.g. an exporter that pushes metrics.
+
+        The listener must implement `inc`, `set_gauge` and `observe`, each taking
+        `(name, value, labels)`.
+        """
+        self._listeners.append(listener)
+
+    def snapshot(self):
+        """
+        Returns a copy of every metric series.
+
+        Returns:
+            dict: ``{"counters": [...], "gauges": [...], "summaries": [...], "histograms": [...]}``
+            where each entry holds the metric name, its labels and its current value(s).
+            Histogram ``buckets`` are cumulative ``[upper bound, count]`` pairs.
+        """
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._counters.items()
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._gauges.items()
+                ],
+                "summaries": [
+                    {"name": name, "labels": dict(labels), **summary}
+                    for (name, labels), summary in self._summaries.items()
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram["count"],
+                        "sum": histogram["sum"],
+                        "buckets": _cumulative(histogram),
+                    }
+                    for (name, labels), histogram in self._histograms.items()
+                ],
+            }
+
+    def reset(self):
+        """Clears every metric series."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        """Renders every metric series in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for counter in _by_name(snapshot["counters"]):
+            header(counter["name"], "counter")
+            lines.append(f"{counter['name']}{_labels(counter['labels'])} {_number(counter['value'])}")
+        for gauge in _by_name(snapshot["gauges"]):
+            header(gauge["name"], "gauge")
+            lines.append(f"{gauge['name']}{_labels(gauge['labels'])} {_number(gauge['value'])}")
+        for summary in _by_name(snapshot["summaries"]):
+            name, labels = summary["name"], summary["labels"]
+            header(name, "summary")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(summary['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {summary['count']}")
+            header(f"{name}_max", "gauge")
+            lines.append(f"{name}_max{_labels(labels)} {_number(summary['max'])}")
+        for histogram in _by_name(snapshot["histograms"]):
+            name, labels = histogram["name"], histogram["labels"]
+            header(name, "histogram")
+            for bound, count in histogram["buckets"]:
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _by_name(series):
+    # Samples of one metric family must be contiguous in the exposition format
+    return sorted(series, key=lambda entry: entry["name"])
+
+
+def _cumulative(histogram):
+    total = 0
+    buckets = []
+    for bound, count in zip(histogram["bounds"] + (float("inf"),), histogram["counts"]):
+        total += count
+        buckets.append([bound, total])
+    return buckets
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+# Process-wide registry used by the app modules
+registry = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are too frequent to log
+
+
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    """
+    Serves the registry as Prometheus text at `/metrics` from a daemon thread.
+
+    Args:
+        port (int): Port to listen on.
+        host (str): Address to bind.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call `shutdown()` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class _OpenTelemetryForwarder:
+    """Registry listener that records every value into OpenTelemetry instruments."""
+
+    def __init__(self, meter):
+        self._meter = meter
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._gauge_values = {}
+
+    def _instrument(self, instruments, name, create):
+        instrument = instruments.get(name)
+        if instrument is None:
+            with self._lock:
+                instrument = instruments.get(name)
+                if instrument is None:
+                    instrument = instruments[name] = create(name)
+        return instrument
+
+    def inc(self, name, value, labels):
+        self._instrument(self._counters, name, self._meter.create_counter).add(value, labels)
+
+    def observe(self, name, value, labels):
+        self._instrument(self._histograms, name, self._meter.create_histogram).record(value, labels)
+
+    def set_gauge(self, name, value, labels):
+        from opentelemetry.metrics import Observation
+
+        self._gauge_values[(name, tuple(sorted(labels.items())))] = value
+
+        def observe_gauge(options, name=name):
+            return [
+                Observation(gauge_value, dict(gauge_labels))
+                for (gauge_name, gauge_labels), gauge_value in list(self._gauge_values.items())
+                if gauge_name == name
+            ]
+
+        self._instrument(
+            self._gauges, name, lambda gauge_name: self._meter.create_observable_gauge(gauge_name, [observe_gauge])
+        )
+
+
+def start_opentelemetry_export(endpoint=OTEL_METRICS_ENDPOINT, interval=OTEL_EXPORT_INTERVAL):
+    """
+    Pushes every metric recorded from now on to an OpenTelemetry collector over OTLP/HTTP.
+
+    Requires the optional `opentelemetry-sdk` and `opentelemetry-exporter-otlp-proto-http`
+    packages.
+
+    Args:
+        endpoint (str): OTLP/HTTP metrics endpoint of the collector.
+        interval (float): Seconds between exports.
+
+    Returns:
+        MeterProvider: The provider; call `shutdown()` to flush and stop exporting.
+    """
+    # Optional dependencies, only needed when exporting to a collector
+    from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+    reader = PeriodicExportingMetricReader(
+        OTLPMetricExporter(endpoint=endpoint), export_interval_millis=interval * 1000
+    )
+    provider = MeterProvider(metric_readers=[reader])
+    registry.add_listener(_OpenTelemetryForwarder(provider.get_meter("hr-leave-langgraph")))
+    return provider
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """
+    Starts the exporters enabled by METRICS_PORT and OTEL_METRICS_ENDPOINT, once per process.
+
+    Exporter failures are logged and leave the app running without them.
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if METRICS_PORT:
+        try:
+            start_http_server()
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", METRICS_PORT, e)
+    if OTEL_METRICS_ENDPOINT:
+        try:
+            start_opentelemetry_export()
+        except ImportError as e:
+            logger.warning("OpenTelemetry export needs the opentelemetry-sdk packages: %s", e)
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.metrics import registry
+
+load_dotenv()
+
+# Cache the static system prompt (and the tool declarations) with Vertex AI context caching.
+# Context caches have a minimum size set by the model; creation failures fall back to
+# sending the full prompt.
+VERTEX_CONTEXT_CACHE = os.getenv("VERTEX_CONTEXT_CACHE", "false").lower() == "true"
+VERTEX_CONTEXT_CACHE_TTL = float(os.getenv("VERTEX_CONTEXT_CACHE_TTL", "3600"))
+# Seconds before retrying after a failed context cache creation
+VERTEX_CONTEXT_CACHE_RETRY = float(os.getenv("VERTEX_CONTEXT_CACHE_RETRY", "600"))
+
+logger = logging.getLogger(__name__)
+
+# The part of the system prompt that is the same for every user and turn. It comes first,
+# so requests share an identical prefix.
+STATIC_SYSTEM_PROMPT = (
+    "You are a helpful assistant. You can help user in English or Thai language. Use the provided tools to assist with tasks such as fetching leave balance(ขอดูวันลาคงเหลือ), request leave(ขอลาหยุด), and checking pending leave requests(ตรวจสอบวันลาที่ส่งไป)."
+    "\n\nAvailable tools:\n\n- Fetch Leave Balance\n- Request Leave-\n- Request Leave Batch\n- Fetch Pending Requests\n- Fetch Leave Dashboard"
+    "\n\nUse the tool `Fetch Leave Balance` to retrieve the user's leave balance. "
+    "You need the `user_id` to perform this operation.\n\n"
+    "Ensure you provide the result in a clear and user-friendly format."
+    "\n\nUse the tool `Request Leave` to perform request leave operation. You need the following details:\n"
+    "- `user_id`: The user's ID.\n"
+    "- `leave_type_id`: The ID of the leave type (1: Vacation, 2: Sick Leave, 3: Personal Time).\n"
+    "- `start_date` and `end_date`: In YYYY-MM-DD format. If the user enters date in Thai or incorrect format convert the leave dates to YYYY-MM-DD format before calling the Request Leave tool.\n"
+    "- `reason`: A brief reason for the leave. If the user does not provide the reason, just add the word None\n\n"
+    "Ensure all parameters are validated before invoking the tool."
+    "\n\nUse the tool `Request Leave Batch` when the user asks for more than one date range at once "
+    "(e.g. \"take every Friday off in March\"): expand the request into its date ranges and submit them all "
+    "in one call, with the same details as `Request Leave` for each. It reports which ranges were submitted "
+    "and why any others were not; pass that on to the user."
+    "\n\nUse the tool `Check Pending Leave Requests` to retrieve the user's pending leave requests. "
+    "You need the `user_id` to perform this operation.\n\n"
+    "Provide the result in a clear and easy-to-read format."
+    "\n\nUse the tool `Fetch Leave Dashboard` when the user asks about more than one of their leave balance, "
+    "pending requests and past requests (e.g. \"what's my balance and what's pending?\"). "
+    "It returns all of them at once, so call it instead of several separate tools."
+)
+
+# Filled in on every turn; `summary` is empty until older turns have been summarized
+TURN_CONTEXT_TEMPLATE = "Current user:\n\n{user_info}\n\nCurrent time: {time}.{summary}"
+
+# Identifies the static prompt; changing the prompt text yields a new context cache
+PROMPT_VERSION = hashlib.sha256(STATIC_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+
+def build_prompt(cached_prefix=False):
+    """
+    Builds the assistant's prompt template.
+
+    Args:
+        cached_prefix (bool): Leave out the static system prompt, because the model serves it
+            from a context cache. Cached requests cannot carry a system instruction, so the
+            turn context is then sent as the first user content instead.
+
+    Returns:
+        ChatPromptTemplate: A template with the `user_info`, `time`, `summary` and `messages` variables.
+    """
+    if cached_prefix:
+        return ChatPromptTemplate.from_messages([
+            ("human", TURN_CONTEXT_TEMPLATE),
+            ("placeholder", "{messages}"),
+        ])
+    return ChatPromptTemplate.from_messages([
+        ("system", STATIC_SYSTEM_PROMPT),
+        ("system", TURN_CONTEXT_TEMPLATE),
+        ("placeholder", "{messages}"),
+    ])
+
+
+def turn_context(user_id, summary=None):
+    """Returns the dynamic prompt variables of the current turn."""
+    return {
+        "user_info": user_id,
+        "time": datetime.now().isoformat(sep=" ", timespec="minutes"),
+        "summary": f"\n\nSummary of the earlier conversation:\n\n{summary}" if summary else "",
+    }
+
+
+_context_caches = {}  # (model, prompt version, tool names) -> (cache name or None, valid until)
+_context_caches_creating = set()  # keys whose context cache is being created
+_context_cache_lock = threading.Lock()
+
+
+def get_context_cache(llm, tools, ttl=VERTEX_CONTEXT_CACHE_TTL):
+    """
+    Returns the Vertex AI context cache holding the static prompt and `tools` for `llm`.
+
+    The cache is created on first use and re-created shortly before it expires. After a
+    failed creation (e.g. a prompt below the model's minimum cache size), None is returned
+    until VERTEX_CONTEXT_CACHE_RETRY seconds have passed.
+
+    One caller creates the cache, outside the lock; the others do not wait for it and
+    get the current cache, which is still valid on the server, or None on first use.
+
+    Args:
+        llm (ChatVertexAI): The chat model.
+        tools (list): The tools bound to the model.
+        ttl (float): Lifetime of the context cache, in seconds.
+
+    Returns:
+        str: The context cache name to pass as `cached_content`, or None.
+    """
+    key = (llm.model_name, PROMPT_VERSION, tuple(tool.name for tool in tools))
+    with _context_cache_lock:
+        name, valid_until = _context_caches.get(key, (None, 0))
+        if valid_until > time.monotonic() or key in _context_caches_creating:
+            return name
+        _context_caches_creating.add(key)
+    try:
+        # Imported here so the prompt module does not pull in the Vertex SDK on its own
+        from langchain_google_vertexai import create_context_cache
+
+        try:
+            name = create_context_cache(
+                llm, [SystemMessage(content=STATIC_SYSTEM_PROMPT)],
+                time_to_live=timedelta(seconds=ttl), tools=tools,
+            )
+            registry.inc("llm_context_cache_created_total")
+            # Refresh ahead of the server-side expiry, so requests never name an expired cache
+            entry = (name, time.monotonic() + ttl * 0.9)
+        except Exception as e:
+            logger.warning("Context cache creation failed, sending the full prompt: %s", e)
+            registry.inc("llm_context_cache_failures_total")
+            entry = (None, time.monotonic() + VERTEX_CONTEXT_CACHE_RETRY)
+        with _context_cache_lock:
+            # Re-checked under the lock: an entry stored meanwhile is kept if it lasts longer
+            if _context_caches.get(key, (None, 0))[1] < entry[1]:
+                _context_caches[key] = entry
+            return _context_caches[key][0]
+    finally:
+        with _context_cache_lock:
+            _context_caches_creating.discard(key)
+
+
+def record_token_usage(message):
+    """
+    Publishes the input tokens of an LLM response and how many of them were served from cache.
+
+    Reads Vertex AI's `cached_content_token_count`, or the standard `cache_read` input token
+    detail of other providers.
+    """
+    usage = message.usage_metadata or {}
+    raw_usage = (message.response_metadata or {}).get("usage_metadata") or {}
+    input_tokens = usage.get("input_tokens") or raw_usage.get("prompt_token_count") or 0
+    cached_tokens = (
+        raw_usage.get("cached_content_token_count")
+        or (usage.get("input_token_details") or {}).get("cache_read")
+        or 0
+    )
+    if not input_tokens:
+        return
+    registry.inc("llm_input_tokens_total", input_tokens, prompt_version=PROMPT_VERSION)
+    registry.inc("llm_cached_input_tokens_total", cached_tokens, prompt_version=PROMPT_VERSION)
+    registry.observe("llm_cached_input_tokens", cached_tokens)
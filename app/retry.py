@@ -0,0 +1,64 @@
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ASSISTANT_MAX_ATTEMPTS = int(os.getenv("ASSISTANT_MAX_ATTEMPTS", "3"))
+ASSISTANT_TURN_BUDGET = float(os.getenv("ASSISTANT_TURN_BUDGET", "30"))
+ASSISTANT_BACKOFF_BASE = float(os.getenv("ASSISTANT_BACKOFF_BASE", "0.5"))
+ASSISTANT_BACKOFF_MAX = float(os.getenv("ASSISTANT_BACKOFF_MAX", "4"))
+
+FALLBACK_RESPONSE = (
+    "Sorry, I couldn't come up with an answer just now. Please try again or rephrase your request.\n\n"
+    "ขออภัย ระบบไม่สามารถตอบคำถามได้ในขณะนี้ กรุณาลองใหม่อีกครั้ง"
+)
+
+
+class RetryPolicy:
+    """
+    Bounds how often and for how long the assistant re-prompts the LLM after an empty response.
+
+    Args:
+        max_attempts (int): Maximum number of LLM calls, including the first one.
+        turn_budget (float): Wall-clock seconds allowed for one assistant step, retries included.
+        backoff_base (float): Upper bound of the first backoff delay, in seconds.
+        backoff_max (float): Cap for any single backoff delay, in seconds.
+        fallback_response (str): Deterministic answer returned once the policy gives up.
+    """
+
+    def __init__(self, max_attempts=ASSISTANT_MAX_ATTEMPTS, turn_budget=ASSISTANT_TURN_BUDGET,
+                 backoff_base=ASSISTANT_BACKOFF_BASE, backoff_max=ASSISTANT_BACKOFF_MAX,
+                 fallback_response=FALLBACK_RESPONSE):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.turn_budget = turn_budget
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.fallback_response = fallback_response
+
+    def backoff(self, attempt):
+        """Returns the delay before the retry following `attempt` (exponential, full jitter)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def next_delay(self, attempt, started):
+        """
+        Decides whether another attempt is allowed.
+
+        Args:
+            attempt (int): Number of attempts made so far.
+            started (float): `time.monotonic()` value taken before the first attempt.
+
+        Returns:
+            float: Seconds to wait before retrying, or None when the attempts or the time
+            budget are exhausted.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if time.monotonic() - started + delay >= self.turn_budget:
+            return None
+        return delay
@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+import uuid
+from typing import NamedTuple
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from app.metrics import registry
+from app.streaming import message_text
+
+# Answer simple, unambiguous lookups ("show my leave balance", "ขอดูวันลาคงเหลือ") by calling
+# the tool directly, without an LLM call. Anything else goes to the assistant.
+FAST_PATH_ROUTER = os.getenv("FAST_PATH_ROUTER", "true").lower() == "true"
+# Longer messages usually carry more than a lookup and are left to the model
+ROUTER_MAX_CHARS = int(os.getenv("ROUTER_MAX_CHARS", "80"))
+
+_THAI = re.compile(r"[\u0e00-\u0e7f]")
+
+# intent -> patterns, English and Thai. A balance is only the leave balance: "balance" or
+# "days left" alone may be anyone's, or about anything.
+_INTENTS = {
+    "balance": re.compile(
+        r"\b(?:leave|vacation|pto|holiday|sick)\s+balances?\b|\bbalances?\s+(?:of|for|on)\s+(?:my\s+)?(?:leave|vacation|pto)\b"
+        r"|\b(?:leave|vacation|pto)(?:\s+days?)?\s+(?:left|remaining)\b|\bdays?\s+(?:of\s+)?(?:leave|vacation|off)\s+(?:left|remaining)\b"
+        r"|\bremaining\s+(?:leave|vacation|pto)\b|\bhow much (?:leave|vacation|pto)\b|\bhow many (?:leave|vacation) days\b"
+        r"|ลา.{0,12}เหลือ|เหลือวันลา|ยอดวันลา|สิทธิ์(?:การ)?ลา",
+        re.IGNORECASE,
+    ),
+    "pending": re.compile(
+        r"\bpending\b|\bawaiting approval\b|\bwaiting (?:for )?approval\b|\bnot (?:yet )?approved\b"
+        r"|รอ(?:การ)?อนุมัติ|ค้างอนุมัติ|ยังไม่(?:ได้)?(?:รับการ)?อนุมัติ|ลาที่(?:ส่ง|ยื่น)(?:ไป|แล้ว)|สถานะ(?:คำขอ|การ)ลา",
+        re.IGNORECASE,
+    ),
+}
+
+# Anything that may ask for an action, a condition, an explanation, or someone else's data,
+# or that says what the user does not want. "คำขอลา" (a leave request) and "ที่ยื่นไป" (already
+# submitted) name pending requests, unlike the verbs "ขอลา" and "ยื่น".
+_AMBIGUOUS = re.compile(
+    r"\d|\b(?:apply|submit|book|take|cancel|withdraw|approve|reject|change|update|why|policy|should|if|next|last"
+    r"|team|manager|colleague|employee|staff|someone|somebody|everyone|his|him|her|their|them)\b"
+    r"|\brequest(?:ing)?\s+(?:an?\s+|some\s+)?(?:leave|days?|vacation|sick|time)"
+    r"|\b(?:do|does|did)\s+not\b|\b(?:don|doesn|didn|won|wouldn)['’]?t\b|\bnever\b|\bno longer\b"
+    r"|\b(?!(?:what|that|it|there|here|who|where|how|let)['’]s\b)\w+['’]s\b|\b\w+s['’](?!\w)"
+    r"|(?<!คำ)ขอลา|(?<!ที่)ยื่น|ยกเลิก|แก้ไข|ทำไม|นโยบาย|ถ้า|ลูกทีม|หัวหน้า|เพื่อน|พนักงาน|เขา"
+    r"|ไม่(?:ต้อง|อยาก|เอา|ใช่|สนใจ)|ของ(?!\s*(?:ฉัน|ผม|ดิฉัน|หนู|เรา|ตัวเอง))",
+    re.IGNORECASE,
+)
+# Someone else named: "balance for John", "of Mary"
+_NAMED = re.compile(r"\b(?:for|of)\s+(?!(?:I|Me|My|Myself|Leave|Vacation|Annual|Sick|Personal|PTO)\b)[A-Z]")
+
+# Intents matched -> tool answering them
+_TOOLS = {
+    frozenset({"balance"}): "fetch_leave_balance",
+    frozenset({"pending"}): "fetch_pending_requests",
+    frozenset({"balance", "pending"}): "fetch_leave_dashboard",
+}
+
+# Thai replies get a heading; tool output is returned as-is
+_THAI_HEADINGS = {
+    "fetch_leave_balance": "วันลาคงเหลือของคุณ",
+    "fetch_pending_requests": "คำขอลาที่รออนุมัติของคุณ",
+    "fetch_leave_dashboard": "สรุปวันลาของคุณ",
+}
+
+
+class Route(NamedTuple):
+    tool: str
+    language: str
+
+
+def classify(text):
+    """
+    Maps a user message to a tool when the intent is simple and unambiguous.
+
+    Args:
+        text (str): The user's message.
+
+    Returns:
+        Route or None: The tool to call and the message language ("en" or "th"), or None
+        if the message should go to the assistant.
+    """
+    text = text.strip()
+    if not text or len(text) > ROUTER_MAX_CHARS or _AMBIGUOUS.search(text) or _NAMED.search(text):
+        return None
+    intents = frozenset(intent for intent, pattern in _INTENTS.items() if pattern.search(text))
+    tool = _TOOLS.get(intents)
+    if tool is None:
+        return None
+    return Route(tool, "th" if _THAI.search(text) else "en")
+
+
+def render_reply(route, tool_output):
+    """Returns the templated reply of a routed turn."""
+    if route.language == "th":
+        return f"{_THAI_HEADINGS[route.tool]}:\n\n{tool_output}"
+    return tool_output
+
+
+def routed(state):
+    """Conditional edge after the router: "answered" if it replied, otherwise "assistant"."""
+    return "answered" if isinstance(state["messages"][-1], AIMessage) else "assistant"
+
+
+class FastPathRouter:
+    """
+    Graph node that answers simple intents without the LLM.
+
+    For a routed message it writes what the assistant would have: an AIMessage with the
+    tool call, the tool's ToolMessage and a templated reply. Otherwise it writes nothing and
+    the turn continues to the assistant. Turns are counted as `router_turns_total` (labels
+    `route` and `language`) and `router_bypass_ratio` is the share answered without the LLM.
+
+    Args:
+        tools (list): The graph's tools; routes only use tools found here.
+    """
+
+    def __init__(self, tools):
+        self.tools = {tool.name: tool for tool in tools}
+        self._lock = threading.Lock()
+        self._turns = 0
+        self._bypassed = 0
+
+    def _plan(self, state, config):
+        messages = state["messages"]
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return None
+        user_id = config.get("configurable", {}).get("user_id")
+        route = classify(message_text(messages[-1])) if user_id else None
+        if route is not None and route.tool not in self.tools:
+            route = None
+        self._record(route, message_text(messages[-1]))
+        if route is None:
+            return None
+        call = {"name": route.tool, "args": {"user_id": user_id}, "id": f"fastpath-{uuid.uuid4().hex[:12]}"}
+        return route, call
+
+    def _record(self, route, text):
+        with self._lock:
+            self._turns += 1
+            self._bypassed += route is not None
+            ratio = self._bypassed / self._turns
+        language = route.language if route else ("th" if _THAI.search(text) else "en")
+        registry.inc("router_turns_total", route=route.tool if route else "assistant", language=language)
+        registry.set_gauge("router_bypass_ratio", ratio)
+
+    @staticmethod
+    def _reply(route, call, tool_message):
+        return {"messages": [
+            AIMessage(content="", tool_calls=[call]),
+            tool_message,
+            AIMessage(content=render_reply(route, message_text(tool_message))),
+        ]}
+
+    def __call__(self, state, config: RunnableConfig):
+        plan = self._plan(state, config)
+        if plan is None:
+            return {"messages": []}
+        route, call = plan
+        tool_message = self.tools[route.tool].invoke({**call, "type": "tool_call"}, config)
+        return self._reply(route, call, tool_message)
+
+    async def acall(self, state, config: RunnableConfig):
+        """Async version of `__call__`."""
+        plan = self._plan(state, config)
+        if plan is None:
+            return {"messages": []}
+        route, call = plan
+        tool_message = await self.tools[route.tool].ainvoke({**call, "type": "tool_call"}, config)
+        return self._reply(route, call, tool_message)
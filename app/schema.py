@@ -0,0 +1,73 @@
+"""
+Indexes needed by the hot queries of `app/db.py` and `app/async_db.py`.
+
+Apply them with `python -m app.schema` (uses the POSTGRES_* settings). Every statement is
+idempotent, so running it again is safe.
+"""
+import logging
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# name -> (table, columns); each index serves the queries listed next to it
+INDEXES = {
+    # EMPLOYEE_ID_QUERY, USER_LEAVE_BALANCE_QUERY, CREATE_USER_LEAVE_REQUEST_QUERY
+    "employees_user_id_idx": ("employees", "user_id"),
+    # EMPLOYEE_LEAVE_BALANCE_QUERY and the balance section of LEAVE_DASHBOARD_QUERY
+    "leave_balances_employee_id_idx": ("leave_balances", "employee_id"),
+    # PENDING_LEAVE_REQUESTS_QUERY and the pending section of LEAVE_DASHBOARD_QUERY
+    "leave_requests_employee_status_idx": ("leave_requests", "employee_id, status"),
+    # LEAVE_REQUESTS_QUERY and the recent section of LEAVE_DASHBOARD_QUERY
+    "leave_requests_employee_request_date_idx": ("leave_requests", "employee_id, request_date DESC"),
+}
+
+
+def index_statements(concurrently=True):
+    """
+    Returns the CREATE INDEX statements of `INDEXES`.
+
+    Args:
+        concurrently (bool): Build without blocking writes (Postgres only; cannot run
+            inside a transaction). Pass False for SQLite.
+
+    Returns:
+        list: (index name, SQL) tuples.
+    """
+    option = "CONCURRENTLY " if concurrently else ""
+    return [
+        (name, f"CREATE INDEX {option}IF NOT EXISTS {name} ON {table} ({columns})")
+        for name, (table, columns) in INDEXES.items()
+    ]
+
+
+def migrate(conn, concurrently=True):
+    """
+    Creates the missing indexes of `INDEXES`.
+
+    Args:
+        conn: A database connection. With `concurrently`, it must be in autocommit mode,
+            as the connections of `app.db` are.
+        concurrently (bool): See `index_statements`.
+
+    Returns:
+        list: The names of the indexes that were checked or created.
+    """
+    applied = []
+    with conn.cursor() as cur:
+        for name, statement in index_statements(concurrently):
+            logger.info("Creating index %s", name)
+            cur.execute(statement)
+            applied.append(name)
+    if not getattr(conn, "autocommit", False):
+        conn.commit()
+    return applied
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    conn = db._connect()
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,96 @@
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+from app.metrics import registry
+
+
+def message_text(message):
+    """
+    Returns the plain text of a message or message chunk.
+
+    Gemini models may return `content` as a list of parts instead of a string.
+    """
+    content = message.content
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type", "text") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def _update_messages(update):
+    """Extracts the messages written by a node from an "updates" stream chunk."""
+    if not isinstance(update, dict):
+        return []
+    messages = update.get("messages")
+    if messages is None:
+        return []
+    return messages if isinstance(messages, list) else [messages]
+
+
+class _TurnEvents:
+    """Turns (mode, chunk) pairs of a "messages"+"updates" graph stream into turn events."""
+
+    def __init__(self, assistant_node):
+        self.assistant_node = assistant_node
+        self.started = time.perf_counter()
+        self.first_output = None
+
+    def _mark_first_output(self):
+        if self.first_output is None:
+            self.first_output = time.perf_counter() - self.started
+            registry.histogram("chat_time_to_first_token_seconds", self.first_output)
+
+    def process(self, mode, chunk):
+        if mode == "messages":
+            message, metadata = chunk
+            if isinstance(message, AIMessageChunk) and metadata.get("langgraph_node") == self.assistant_node:
+                text = message_text(message)
+                if text:
+                    self._mark_first_output()
+                    yield "token", text
+        elif mode == "updates":
+            for update in chunk.values():
+                for message in _update_messages(update):
+                    if isinstance(message, ToolMessage):
+                        yield "tool", message
+                    elif isinstance(message, AIMessage):
+                        if message_text(message):
+                            self._mark_first_output()
+                        yield "message", message
+
+    def finish(self):
+        registry.histogram("chat_turn_seconds", time.perf_counter() - self.started)
+
+
+def stream_turn(graph, inputs, config, assistant_node="assistant"):
+    """
+    Runs one conversation turn and yields its output as it is produced.
+
+    Yields:
+        tuple: One of
+            - ("token", str): A piece of the assistant's reply text, as generated by the LLM.
+            - ("tool", ToolMessage): A tool result, as soon as the tool node finishes.
+            - ("message", AIMessage): A complete assistant message.
+
+    The time to the first visible output (a token or a complete message) and the total
+    turn time are recorded as `chat_time_to_first_token_seconds` and `chat_turn_seconds`.
+    """
+    events = _TurnEvents(assistant_node)
+    for mode, chunk in graph.stream(inputs, config, stream_mode=["messages", "updates"]):
+        yield from events.process(mode, chunk)
+    events.finish()
+
+
+async def astream_turn(graph, inputs, config, assistant_node="assistant"):
+    """Async version of `stream_turn`, driven by `graph.astream`."""
+    events = _TurnEvents(assistant_node)
+    async for mode, chunk in graph.astream(inputs, config, stream_mode=["messages", "updates"]):
+        for event in events.process(mode, chunk):
+            yield event
+    events.finish()
@@ -0,0 +1,495 @@
+import asyncio
+import os
+import time
+from datetime import date, datetime
+from typing import Annotated
+from typing_extensions import TypedDict
+
+import dotenv
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.tools import StructuredTool
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import AnyMessage, add_messages
+from langgraph.prebuilt import ToolNode, tools_condition
+
+from app import aio, async_db, db
+from app.checkpoint import create_async_checkpointer, create_checkpointer
+from app.clients import cached_factory, get_chat_llm
+from app.holidays import get_calendar
+from app.history import HistorySummarizer, window
+from app.instrumentation import GraphMetricsCallback
+from app.llm_cache import LLM_CACHE, response_cache
+from app.metrics import registry
+from app.prompts import VERTEX_CONTEXT_CACHE, build_prompt, get_context_cache, record_token_usage, turn_context
+from app.retry import RetryPolicy
+from app.router import FAST_PATH_ROUTER, FastPathRouter, routed
+from app.streaming import message_text
+
+dotenv.load_dotenv()
+
+# Local latency metrics of graph nodes, tools and LLM calls (see app/metrics.py for export)
+graph_metrics = GraphMetricsCallback()
+
+# Run turns with graph.astream on a shared event loop: LLM calls, tools, DB queries and
+# checkpoints are awaited instead of holding a thread each
+ASYNC_GRAPH = os.environ.get('ASYNC_GRAPH', 'false').lower() == 'true'
+
+# Define State
+class State(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+    # Running summary of the turns removed from `messages` by the history node
+    summary: str
+
+class Assistant:
+    """Encapsulates the assistant logic for handling runnable tasks."""
+    def __init__(self, runnable: Runnable, retry_policy: RetryPolicy = None):
+        self.runnable = runnable
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    @staticmethod
+    def _is_empty(result) -> bool:
+        return not result.tool_calls and not message_text(result)
+
+    def __call__(self, state, config: RunnableConfig):
+        configuration = config.get("configurable", {})
+        user_id = configuration.get("user_id", None)
+        # Only the most recent turns that fit the token budget are sent to the model
+        state = {**state, **turn_context(user_id, state.get("summary")), "messages": window(state["messages"])}
+        started = time.monotonic()
+        attempt = 1
+        result = self.runnable.invoke(state)
+
+        # Re-prompt if LLM returns an empty response, within the retry policy's limits
+        while self._is_empty(result):
+            delay = self.retry_policy.next_delay(attempt, started)
+            if delay is None:
+                registry.inc("assistant_fallback_total")
+                result = AIMessage(content=self.retry_policy.fallback_response)
+                break
+            registry.inc("assistant_empty_retries_total")
+            time.sleep(delay)
+            attempt += 1
+            # The nudge replaces, rather than accumulates on, the previous attempt's prompt
+            messages = state["messages"] + [("user", "Respond with a real output.")]
+            result = self.runnable.invoke({**state, "messages": messages})
+
+        return self._finish(result, attempt, started)
+
+    async def acall(self, state, config: RunnableConfig):
+        """Async version of `__call__`, used when the graph runs with `astream`/`ainvoke`."""
+        configuration = config.get("configurable", {})
+        user_id = configuration.get("user_id", None)
+        # Only the most recent turns that fit the token budget are sent to the model
+        state = {**state, **turn_context(user_id, state.get("summary")), "messages": window(state["messages"])}
+        started = time.monotonic()
+        attempt = 1
+        result = await self.runnable.ainvoke(state)
+
+        while self._is_empty(result):
+            delay = self.retry_policy.next_delay(attempt, started)
+            if delay is None:
+                registry.inc("assistant_fallback_total")
+                result = AIMessage(content=self.retry_policy.fallback_response)
+                break
+            registry.inc("assistant_empty_retries_total")
+            await asyncio.sleep(delay)
+            attempt += 1
+            messages = state["messages"] + [("user", "Respond with a real output.")]
+            result = await self.runnable.ainvoke({**state, "messages": messages})
+
+        return self._finish(result, attempt, started)
+
+    @staticmethod
+    def _finish(result, attempt, started):
+        record_token_usage(result)
+        registry.observe("assistant_attempts", attempt)
+        if attempt > 1:
+            registry.histogram("assistant_retry_seconds", time.monotonic() - started)
+        return {"messages": result}
+      
+def resolve_employee_id(user_id: str, config: RunnableConfig = None):
+    """
+    Returns the employee ID of `user_id`.
+
+    Uses the ID resolved once per session and passed as `employee_id` in the run config,
+    falling back to the process-wide identity cache.
+    """
+    configuration = (config or {}).get("configurable", {})
+    if configuration.get("employee_id") is not None and configuration.get("user_id") == user_id:
+        return configuration["employee_id"]
+    return db.resolve_employee_id(user_id)
+
+async def aresolve_employee_id(user_id: str, config: RunnableConfig = None):
+    """Async version of `resolve_employee_id`."""
+    configuration = (config or {}).get("configurable", {})
+    if configuration.get("employee_id") is not None and configuration.get("user_id") == user_id:
+        return configuration["employee_id"]
+    return await async_db.resolve_employee_id(user_id)
+
+# Tool output formatting, shared by the sync and async tool implementations
+@registry.timed("tool_format_seconds", tool="fetch_leave_balance")
+def format_leave_balance(leave_balance) -> str:
+    if leave_balance is None:
+        return f"Failed to fetch leave balance from the database."
+    if leave_balance:
+        response = "Your leave balance:\n\n"
+        for leave_type, available, used in leave_balance:
+            response += (f"- {leave_type}: Available: {available}, Used: {used}, "
+                        f"Remaining: {available - used}\n")
+        return response
+    return f"No leave balance found for your account."
+
+@registry.timed("tool_format_seconds", tool="fetch_pending_requests")
+def format_pending_requests(pending_requests) -> str:
+    if pending_requests is None:
+        return "Failed to fetch pending leave requests from the database."
+    if pending_requests:
+        response = "Your pending leave requests:\n\n"
+        for leave_type, start_date, end_date, days_requested, reason, request_date in pending_requests:
+            response += (f"- {leave_type}: Start Date: {start_date}, End Date: {end_date}, "
+                        f"Days Requested: {days_requested}, Reason: {reason}, Requested On: {request_date}\n")
+        return response
+    return "No pending leave requests found."
+
+@registry.timed("tool_format_seconds", tool="fetch_leave_dashboard")
+def format_leave_dashboard(dashboard) -> str:
+    if dashboard is None:
+        return "Failed to fetch leave dashboard from the database."
+    sections = {"balance": [], "pending": [], "recent": []}
+    for section, leave_type, available, used, start_date, end_date, days_requested, reason, status, request_date in dashboard:
+        if section == "balance":
+            sections[section].append(f"- {leave_type}: Available: {available}, Used: {used}, "
+                                     f"Remaining: {available - used}")
+        else:
+            sections[section].append(f"- {leave_type}: {start_date} to {end_date}, {days_requested} day(s), "
+                                     f"Reason: {reason}, Status: {status}, Requested On: {request_date}")
+    response = "Your leave balance:\n\n" + ("\n".join(sections["balance"]) or "No leave balance found.")
+    response += "\n\nYour pending leave requests:\n\n" + ("\n".join(sections["pending"]) or "No pending leave requests.")
+    response += "\n\nYour recent leave requests:\n\n" + ("\n".join(sections["recent"]) or "No recent leave requests.")
+    return response + "\n"
+
+# One date range of a `request_leave_batch` call
+class LeaveRequestItem(TypedDict):
+    leave_type_id: int
+    start_date: str
+    end_date: str
+    reason: str
+
+# Per-item outcomes of a leave batch (see db.CREATE_USER_LEAVE_REQUESTS_QUERY)
+LEAVE_BATCH_OUTCOMES = {
+    "submitted": "Submitted, pending approval",
+    "invalid_dates": "Not submitted: dates must be YYYY-MM-DD, with the end date on or after the start date",
+    "no_working_days": "Not submitted: no working days in this range (weekends and company holidays only)",
+    "unknown_employee": "Not submitted: employee not found, please contact HR",
+    "unknown_leave_type": "Not submitted: unknown leave type",
+    "overlaps_existing": "Not submitted: overlaps one of your pending or approved leave requests",
+    "overlaps_batch": "Not submitted: overlaps an earlier date range submitted with this request",
+    "insufficient_balance": "Not submitted: not enough leave balance left",
+}
+
+def prepare_leave_batch(requests):
+    """
+    Checks the dates of a leave batch and counts their working days with the holiday calendar.
+
+    Returns:
+        tuple: (statuses, rows). `statuses` has one entry per request: None if it is to be
+        submitted, else the outcome that rejects it. `rows` are the
+        (leave_type_id, start_date, end_date, working_days, reason) tuples to submit.
+    """
+    calendar = get_calendar()
+    statuses, rows = [], []
+    for request in requests:
+        try:
+            start_date = date.fromisoformat(request["start_date"])
+            end_date = date.fromisoformat(request["end_date"])
+        except (KeyError, TypeError, ValueError):
+            statuses.append("invalid_dates")
+            continue
+        if end_date < start_date:
+            statuses.append("invalid_dates")
+            continue
+        working_days = calendar.working_days(start_date, end_date)
+        if working_days == 0:
+            statuses.append("no_working_days")
+            continue
+        statuses.append(None)
+        rows.append((request["leave_type_id"], start_date.isoformat(), end_date.isoformat(), working_days,
+                     request.get("reason") or "None"))
+    return statuses, rows
+
+@registry.timed("tool_format_seconds", tool="request_leave_batch")
+def format_leave_batch(requests, statuses, rows, results) -> str:
+    if results is None:
+        return "Failed to submit the leave requests. Please try again, or contact HR if this persists."
+    outcomes = iter(zip(rows, results))
+    lines = []
+    for request, status in zip(requests, statuses):
+        line = f"- {request.get('start_date')} to {request.get('end_date')}"
+        outcome = LEAVE_BATCH_OUTCOMES.get(status, status)
+        if status is None:
+            (_, _, _, working_days, _), (status, _, remaining_days) = next(outcomes)
+            line += f" ({working_days} working day(s))"
+            outcome = LEAVE_BATCH_OUTCOMES.get(status, status)
+            if status == "insufficient_balance":
+                outcome += f" ({max(remaining_days or 0, 0)} day(s) left)"
+        lines.append(f"{line}: {outcome}")
+    response = f"Submitted {sum(status == 'submitted' for status, _, _ in results)} of {len(requests)} leave request(s):\n\n"
+    return response + "\n".join(lines) + "\n"
+
+def count_requested_days(start_date: str, end_date: str) -> int:
+    """Counts the working days of a leave request, as a batch does: weekends and company holidays are free."""
+    start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return get_calendar().working_days(start_date_obj, end_date_obj)
+
+NO_WORKING_DAYS = ("Leave request not submitted: there are no working days from the start date to the end date "
+                   "(weekends and company holidays only, or the end date is before the start date).")
+
+def _fetch_leave_balance(user_id: str, config: RunnableConfig):
+    """Fetches the user's leave balance from the database."""
+    if not user_id:
+        return f"User ID not found. Please log in again."
+    try:
+        employee_id = resolve_employee_id(user_id, config)
+        if employee_id is None:
+            return "Employee ID not found. Please contact HR."
+        return format_leave_balance(db.get_leave_balance(employee_id))
+    except Exception as e:
+        return f"Error fetching leave balance: {e}"
+
+async def _afetch_leave_balance(user_id: str, config: RunnableConfig):
+    if not user_id:
+        return f"User ID not found. Please log in again."
+    try:
+        employee_id = await aresolve_employee_id(user_id, config)
+        if employee_id is None:
+            return "Employee ID not found. Please contact HR."
+        return format_leave_balance(await async_db.get_leave_balance(employee_id))
+    except Exception as e:
+        return f"Error fetching leave balance: {e}"
+
+def _request_leave(user_id: str, leave_type_id: int, start_date: str, end_date: str, reason: str):
+    """Submits a leave request for the user."""
+    if not user_id:
+        return "User ID not found. Please log in again."
+    try:
+        days_requested = count_requested_days(start_date, end_date)
+    except ValueError as e:
+        return f"Error submitting leave request: {e}"
+    if days_requested == 0:
+        return NO_WORKING_DAYS
+    conn = db.connect_to_db()
+    if conn:
+        try:
+            # Submit leave request; the employee is resolved by the INSERT itself
+            employee_id = db.create_user_leave_request(conn, user_id, leave_type_id, start_date, end_date, days_requested, reason)
+            if employee_id is not None:
+                return "Leave request submitted successfully and is pending approval."
+            return "Failed to submit leave request. Please check the leave type, or contact HR if this persists."
+        except Exception as e:
+            return f"Error submitting leave request: {e}"
+        finally:
+            db.release_connection(conn)
+    return f"Failed to connect to the database."
+
+async def _arequest_leave(user_id: str, leave_type_id: int, start_date: str, end_date: str, reason: str):
+    if not user_id:
+        return "User ID not found. Please log in again."
+    try:
+        days_requested = count_requested_days(start_date, end_date)
+        if days_requested == 0:
+            return NO_WORKING_DAYS
+        employee_id = await async_db.create_user_leave_request(user_id, leave_type_id, start_date, end_date, days_requested, reason)
+        if employee_id is not None:
+            return "Leave request submitted successfully and is pending approval."
+        return "Failed to submit leave request. Please check the leave type, or contact HR if this persists."
+    except Exception as e:
+        return f"Error submitting leave request: {e}"
+
+def _request_leave_batch(user_id: str, requests: list[LeaveRequestItem]):
+    """
+    Submits several leave requests for the user at once, e.g. every Friday of a month.
+    Each date range is checked against the leave balance, the user's existing requests and
+    the holiday calendar, and the outcome of each is reported.
+    """
+    if not user_id:
+        return "User ID not found. Please log in again."
+    if not requests:
+        return "No leave requests to submit."
+    if len(requests) > db.LEAVE_BATCH_MAX_ITEMS:
+        return f"Too many leave requests at once. Please submit at most {db.LEAVE_BATCH_MAX_ITEMS} date ranges."
+    statuses, rows = prepare_leave_batch(requests)
+    if not rows:
+        return format_leave_batch(requests, statuses, rows, [])
+    conn = db.connect_to_db()
+    if conn:
+        try:
+            # Validated and inserted in one transaction and one round-trip
+            return format_leave_batch(requests, statuses, rows, db.create_user_leave_requests(conn, user_id, rows))
+        except Exception as e:
+            return f"Error submitting leave requests: {e}"
+        finally:
+            db.release_connection(conn)
+    return "Failed to connect to the database."
+
+async def _arequest_leave_batch(user_id: str, requests: list[LeaveRequestItem]):
+    if not user_id:
+        return "User ID not found. Please log in again."
+    if not requests:
+        return "No leave requests to submit."
+    if len(requests) > db.LEAVE_BATCH_MAX_ITEMS:
+        return f"Too many leave requests at once. Please submit at most {db.LEAVE_BATCH_MAX_ITEMS} date ranges."
+    statuses, rows = prepare_leave_batch(requests)
+    if not rows:
+        return format_leave_batch(requests, statuses, rows, [])
+    try:
+        return format_leave_batch(requests, statuses, rows, await async_db.create_user_leave_requests(user_id, rows))
+    except Exception as e:
+        return f"Error submitting leave requests: {e}"
+
+def _fetch_pending_requests(user_id: str, config: RunnableConfig):
+    """Fetches all pending leave requests for the user."""
+    if not user_id:
+        return "User ID not found. Please log in again."
+    try:
+        employee_id = resolve_employee_id(user_id, config)
+        if employee_id is None:
+            return "Employee ID not found. Please contact HR."
+        return format_pending_requests(db.get_pending_leave_requests(employee_id))
+    except Exception as e:
+        return f"Error fetching pending requests: {e}"
+
+async def _afetch_pending_requests(user_id: str, config: RunnableConfig):
+    if not user_id:
+        return "User ID not found. Please log in again."
+    try:
+        employee_id = await aresolve_employee_id(user_id, config)
+        if employee_id is None:
+            return "Employee ID not found. Please contact HR."
+        return format_pending_requests(await async_db.get_pending_leave_requests(employee_id))
+    except Exception as e:
+        return f"Error fetching pending requests: {e}"
+
+def _fetch_leave_dashboard(user_id: str, config: RunnableConfig):
+    """Fetches the user's leave balance, pending leave requests and most recent decided requests at once."""
+    if not user_id:
+        return "User ID not found. Please log in again."
+    try:
+        employee_id = resolve_employee_id(user_id, config)
+        if employee_id is None:
+            return "Employee ID not found. Please contact HR."
+        return format_leave_dashboard(db.get_leave_dashboard(employee_id))
+    except Exception as e:
+        return f"Error fetching leave dashboard: {e}"
+
+async def _afetch_leave_dashboard(user_id: str, config: RunnableConfig):
+    if not user_id:
+        return "User ID not found. Please log in again."
+    try:
+        employee_id = await aresolve_employee_id(user_id, config)
+        if employee_id is None:
+            return "Employee ID not found. Please contact HR."
+        return format_leave_dashboard(await async_db.get_leave_dashboard(employee_id))
+    except Exception as e:
+        return f"Error fetching leave dashboard: {e}"
+
+# Each tool has a sync and an async implementation; `graph.astream` uses the latter
+fetch_leave_balance = StructuredTool.from_function(
+    _fetch_leave_balance, coroutine=_afetch_leave_balance, name="fetch_leave_balance"
+)
+request_leave = StructuredTool.from_function(
+    _request_leave, coroutine=_arequest_leave, name="request_leave"
+)
+request_leave_batch = StructuredTool.from_function(
+    _request_leave_batch, coroutine=_arequest_leave_batch, name="request_leave_batch"
+)
+fetch_pending_requests = StructuredTool.from_function(
+    _fetch_pending_requests, coroutine=_afetch_pending_requests, name="fetch_pending_requests"
+)
+fetch_leave_dashboard = StructuredTool.from_function(
+    _fetch_leave_dashboard, coroutine=_afetch_leave_dashboard, name="fetch_leave_dashboard"
+)
+
+# Tools to use
+tools_to_use = [fetch_leave_balance, request_leave, request_leave_batch, fetch_pending_requests, fetch_leave_dashboard]
+
+# Prompts
+primary_assistant_prompt = build_prompt()
+cached_prefix_prompt = build_prompt(cached_prefix=True)
+
+# Runnables
+@cached_factory
+def get_llm_with_tools():
+    """Returns the chat model with the tools bound, created on the first assistant call."""
+    return get_chat_llm().bind_tools(tools_to_use)
+
+def select_assistant_runnable(state):
+    """
+    Picks the prompt + model runnable of the current call.
+
+    With VERTEX_CONTEXT_CACHE enabled, the static prompt and tool declarations are read
+    from the model's context cache and only the turn context and messages are sent.
+    """
+    cached_content = get_context_cache(get_chat_llm(), tools_to_use) if VERTEX_CONTEXT_CACHE else None
+    if cached_content:
+        return cached_prefix_prompt | get_chat_llm().bind(cached_content=cached_content)
+    return primary_assistant_prompt | get_llm_with_tools()
+
+assistant_runnable = RunnableLambda(select_assistant_runnable, name="assistant_runnable")
+
+# Helper functions
+def handle_tool_error(error):
+    return f"An error occurred while using the tool: {str(error)}"
+
+def create_tool_node_with_fallback(tools: list) -> dict:
+    return ToolNode(tools).with_fallbacks(
+        [RunnableLambda(handle_tool_error)], exception_key="error"
+    )
+
+# Graph construction
+def build_graph(llm=None, fast_path=FAST_PATH_ROUTER) -> StateGraph:
+    """
+    Builds the LangGraph workflow.
+
+    Args:
+        llm (optional): Chat model to use instead of the Vertex AI model, e.g. a scripted
+            model in the benchmarks.
+        fast_path (bool): Answer simple lookups with the router node, without the LLM.
+    """
+    builder = StateGraph(State)
+    runnable = assistant_runnable if llm is None else primary_assistant_prompt | llm.bind_tools(tools_to_use)
+    if LLM_CACHE:
+        # Repeated turns of a user reuse the final reply instead of calling the model
+        runnable = response_cache.wrap(runnable)
+    assistant = Assistant(runnable)
+    # Exposes both entry points, so the node awaits the LLM when the graph runs async
+    builder.add_node("assistant", RunnableLambda(assistant, afunc=assistant.acall, name="assistant"))
+    builder.add_node("tools", create_tool_node_with_fallback(tools_to_use))
+    # Summarizes older turns before the assistant runs, once the history exceeds its token budget
+    summarizer = HistorySummarizer(llm)
+    builder.add_node("history", RunnableLambda(summarizer, afunc=summarizer.acall, name="history"))
+    if fast_path:
+        router = FastPathRouter(tools_to_use)
+        builder.add_node("router", RunnableLambda(router, afunc=router.acall, name="router"))
+        builder.add_edge(START, "router")
+        builder.add_conditional_edges("router", routed, {"answered": END, "assistant": "history"})
+    else:
+        builder.add_edge(START, "history")
+    builder.add_edge("history", "assistant")
+    builder.add_conditional_edges("assistant", tools_condition)
+    builder.add_edge("tools", "assistant")
+    return builder
+
+@cached_factory
+def get_graph():
+    """
+    Compiles the LangGraph workflow once per process and shares it across Streamlit sessions.
+
+    Sessions are kept apart by their `thread_id`, so the checkpointer carries each
+    conversation's history between turns.
+    """
+    if ASYNC_GRAPH:
+        # Async savers are bound to the loop they were created on: the background loop of app.aio
+        return build_graph().compile(checkpointer=aio.run(create_async_checkpointer()))
+    return build_graph().compile(checkpointer=create_checkpointer())
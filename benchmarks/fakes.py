@@ -0,0 +1,72 @@
+"""
+A scripted chat model that stands in for Vertex AI in the benchmarks.
+
+It picks a tool from keywords of the latest user message, emits a deterministic tool call
+for the current user (read from the prompt's turn context), and answers once the tool
+result is in, after a configurable simulated latency.
+"""
+import asyncio
+import re
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# One simulated employee's conversation; sessions cycle through it
+WORKLOAD = [
+    "What is my leave balance?",
+    "Show my pending leave requests",
+    "Request vacation from 2025-12-01 to 2025-12-02 for a family trip",
+    "What is my leave balance and what is pending?",
+]
+
+_CURRENT_USER = re.compile(r"Current user:\s*(\S+)")
+_DATES = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic tool-calling chat model; each call waits `latency` seconds."""
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    @staticmethod
+    def _reply(messages):
+        if isinstance(messages[-1], ToolMessage):
+            first_line = messages[-1].content.strip().splitlines()[0] if messages[-1].content.strip() else ""
+            return AIMessage(content=f"Here is what I found. {first_line}")
+        prompt = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "").lower()
+        user = next((match.group(1) for m in messages if (match := _CURRENT_USER.search(str(m.content)))), None)
+        if "balance" in prompt and "pending" in prompt:
+            name, args = "fetch_leave_dashboard", {"user_id": user}
+        elif "balance" in prompt:
+            name, args = "fetch_leave_balance", {"user_id": user}
+        elif "pending" in prompt:
+            name, args = "fetch_pending_requests", {"user_id": user}
+        elif "request" in prompt:
+            dates = _DATES.findall(prompt) or ["2025-12-01"]
+            name, args = "request_leave", {
+                "user_id": user, "leave_type_id": 1, "start_date": dates[0],
+                "end_date": dates[-1], "reason": "Benchmark",
+            }
+        else:
+            return AIMessage(content="I can help with leave balances, requests and pending requests.")
+        call_id = f"call-{len(messages)}-{name}"
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
@@ -0,0 +1,55 @@
+"""
+Measures the per-turn graph setup overhead of the chat loop.
+
+"before" rebuilds and compiles the graph with a fresh MemorySaver on every turn (the old
+behaviour of `main()`); "after" fetches the process-wide compiled graph from `get_graph()`.
+
+Usage:
+    python -m benchmarks.graph_overhead --turns 200 [--output results.json]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from app import workflow
+
+
+def _time_turns(setup, turns):
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        setup()
+        samples.append(time.perf_counter() - started)
+    return {
+        "turns": turns,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": statistics.median(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def run(turns):
+    before = _time_turns(lambda: workflow.build_graph().compile(checkpointer=MemorySaver()), turns)
+    workflow.get_graph()  # Prime the resource cache, as the first session of a process would
+    after = _time_turns(workflow.get_graph, turns)
+    return {
+        "before": before,
+        "after": after,
+        "speedup": before["mean_ms"] / after["mean_ms"] if after["mean_ms"] else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.turns)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
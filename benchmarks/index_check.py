@@ -0,0 +1,119 @@
+"""
+Checks with EXPLAIN that the hot read queries of `app/db.py` use the indexes of
+`app/schema.py`.
+
+Runs against a seeded SQLite stand-in (default, `EXPLAIN QUERY PLAN`) or a local Postgres
+(`--backend postgres`, using the POSTGRES_* settings; add `--seed` to create, fill and index
+the tables). The benchmark tables are tiny, so on Postgres sequential scans are disabled for
+the check: it confirms each index can serve its query, not the planner's choice at
+production size.
+
+Usage:
+    python -m benchmarks.index_check [--backend postgres [--seed]] [--output results.json]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+
+from app import db, schema
+from benchmarks.stand_in_db import RoundTripCounter, SQLiteConnection, bench_user_id, postgres_connect, seed
+
+# query name -> (query, parameter kinds, indexes the plan must use)
+HOT_QUERIES = {
+    "employee_id": (db.EMPLOYEE_ID_QUERY, ("user",), ("employees_user_id_idx",)),
+    "user_leave_balance": (db.USER_LEAVE_BALANCE_QUERY, ("user",), ("employees_user_id_idx",)),
+    "employee_leave_balance": (
+        db.EMPLOYEE_LEAVE_BALANCE_QUERY, ("employee",), ("leave_balances_employee_id_idx",),
+    ),
+    "pending_leave_requests": (
+        db.PENDING_LEAVE_REQUESTS_QUERY, ("employee",), ("leave_requests_employee_status_idx",),
+    ),
+    "leave_requests": (
+        db.LEAVE_REQUESTS_QUERY, ("employee",), ("leave_requests_employee_request_date_idx",),
+    ),
+    "leave_dashboard": (
+        db.LEAVE_DASHBOARD_QUERY, ("employee", "employee", "employee", "limit"),
+        ("leave_balances_employee_id_idx", "leave_requests_employee_status_idx",
+         "leave_requests_employee_request_date_idx"),
+    ),
+}
+
+_INDEX_NAME = re.compile("|".join(sorted(schema.INDEXES, key=len, reverse=True)))
+
+
+def explain(conn, query, params, dialect):
+    """Returns the plan of `query` as text."""
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    with conn.cursor() as cur:
+        cur.execute(prefix + query.strip().rstrip(";"), params)
+        rows = cur.fetchall()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def check_indexes(conn, dialect="sqlite", user_id=None):
+    """
+    EXPLAINs each query of `HOT_QUERIES` and reports the schema indexes its plan uses.
+
+    Args:
+        conn: A connection from `SQLiteConnection` or psycopg2, to a database with the
+            indexes of `app.schema` applied.
+        dialect (str): "sqlite" or "postgres".
+        user_id (str, optional): Azure AD user ID to plan for. Defaults to the first seeded employee.
+
+    Returns:
+        dict: {"ok": bool, "queries": {name: {"expected", "used", "ok"}}}.
+    """
+    user_id = user_id or bench_user_id(0)
+    employee_id = db.fetch_employee_id(conn, user_id)
+    values = {"user": user_id, "employee": employee_id, "limit": db.LEAVE_DASHBOARD_RECENT_LIMIT}
+    if dialect == "postgres":
+        with conn.cursor() as cur:
+            # Fresh statistics, so the planner tells apart indexes sharing a leading column
+            cur.execute("ANALYZE employees, leave_balances, leave_requests")
+            cur.execute("SET enable_seqscan = off")
+    try:
+        report = {}
+        for name, (query, kinds, expected) in HOT_QUERIES.items():
+            plan = explain(conn, query, tuple(values[kind] for kind in kinds), dialect)
+            used = sorted(set(_INDEX_NAME.findall(plan)))
+            report[name] = {"expected": list(expected), "used": used, "ok": set(expected) <= set(used)}
+    finally:
+        if dialect == "postgres":
+            with conn.cursor() as cur:
+                cur.execute("RESET enable_seqscan")
+    return {"ok": all(entry["ok"] for entry in report.values()), "queries": report}
+
+
+def run(backend="sqlite", seed_postgres=False):
+    if backend == "postgres":
+        conn = postgres_connect(RoundTripCounter())()
+        if seed_postgres:
+            seed(conn, 1, dialect="postgres")
+            schema.migrate(conn)
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="hr-leave-index-"), "leave.sqlite")
+        conn = SQLiteConnection(path)
+        seed(conn, 1)
+        schema.migrate(conn, concurrently=False)
+    try:
+        return {"backend": backend, **check_indexes(conn, backend)}
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--seed", action="store_true", help="Create, seed and index the Postgres tables")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.backend, args.seed)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if results["ok"] else 1)
@@ -0,0 +1,99 @@
+"""
+Benchmark of multi-range leave submissions against a local Postgres (POSTGRES_* settings):
+one `request_leave` tool call per date range, as the assistant did before, versus one
+`request_leave_batch` call that validates and inserts every range in one round-trip.
+
+Reports the median time and DB round-trips per submission for each number of ranges. In
+the app each sequential tool call also costs an LLM step, which is not included here.
+Ranges are consecutive single working days of a seeded employee; they are deleted again
+after each run.
+
+Usage:
+    python -m benchmarks.leave_batch --ranges 4,20 [--repeats 5] [--seed] [--output results.json]
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+from app import db, schema, workflow
+from benchmarks.stand_in_db import RoundTripCounter, bench_user_id, postgres_connect, seed
+
+REASON = "Leave batch benchmark"
+# Personal Time, the seeded leave type with the largest balance
+LEAVE_TYPE_ID = 3
+
+
+def _working_days(count, start=date(2030, 1, 7)):
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def _clean_up(conn):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM leave_requests WHERE reason = %s", (REASON,))
+
+
+def _sequential(user_id, days):
+    return [workflow._request_leave(user_id, LEAVE_TYPE_ID, day, day, REASON) for day in days]
+
+
+def _batch(user_id, days):
+    return workflow._request_leave_batch(user_id, [
+        {"leave_type_id": LEAVE_TYPE_ID, "start_date": day, "end_date": day, "reason": REASON} for day in days
+    ])
+
+
+def _measure(conn, counter, submit, ranges, repeats):
+    samples, round_trips = [], []
+    for _ in range(repeats):
+        _clean_up(conn)
+        counter.reset()
+        started = time.perf_counter()
+        submit(bench_user_id(0), _working_days(ranges))
+        samples.append(time.perf_counter() - started)
+        round_trips.append(counter.round_trips)
+    _clean_up(conn)
+    return {"p50_ms": statistics.median(samples) * 1000, "db_round_trips": statistics.median(round_trips)}
+
+
+def run(ranges, repeats, seed_postgres=False):
+    counter = RoundTripCounter()
+    connect = postgres_connect(counter)
+    conn = connect()
+    if seed_postgres:
+        seed(conn, 1, dialect="postgres")
+        schema.migrate(conn)
+    db.configure_pool(connect=connect)
+    try:
+        results = []
+        for count in ranges:
+            results.append({
+                "ranges": count,
+                "sequential": _measure(conn, counter, _sequential, count, repeats),
+                "batch": _measure(conn, counter, _batch, count, repeats),
+            })
+    finally:
+        db.get_pool().closeall()
+        conn.close()
+    return {"repeats": repeats, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ranges", default="4,20", help="Comma-separated numbers of date ranges per submission")
+    parser.add_argument("--repeats", type=int, default=5, help="Submissions measured per case")
+    parser.add_argument("--seed", action="store_true", help="Create and seed the Postgres tables")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run([int(count) for count in args.ranges.split(",")], args.repeats, args.seed)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,149 @@
+"""
+Measures how many concurrent chat sessions one instance serves within a latency SLO.
+
+Each session runs turns of the real graph (assistant -> tool -> assistant) against a
+scripted chat model and tool data source with fixed, simulated latencies, so the
+numbers reflect how the execution model overlaps waiting rather than model speed.
+
+"sync" runs every session's turn with `graph.stream` on a pool of `--threads` worker
+threads, as blocking request handlers would; "async" runs every session with
+`graph.astream` on the shared event loop of `app.aio`.
+
+The fast-path router is off unless `--fast-path` is given, as it would answer the
+balance question without the LLM.
+
+Usage:
+    python -m benchmarks.load_sessions --mode async --max-sessions 256 [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from app import aio, async_db, db, workflow
+from app.streaming import astream_turn, stream_turn
+from benchmarks.fakes import ScriptedChatModel
+
+BALANCE = [("Annual Leave", 10, 2), ("Sick Leave", 30, 1)]
+
+
+def _install_data_source(db_latency):
+    def get_leave_balance(employee_id):
+        time.sleep(db_latency)
+        return BALANCE
+
+    async def aget_leave_balance(employee_id):
+        await asyncio.sleep(db_latency)
+        return BALANCE
+
+    db.get_leave_balance = get_leave_balance
+    async_db.get_leave_balance = aget_leave_balance
+
+
+def _config():
+    return {"configurable": {"user_id": "bench-user", "employee_id": 1, "thread_id": uuid.uuid4().hex}}
+
+
+def _summary(samples, sessions, elapsed):
+    samples = sorted(samples)
+    # Inclusive, so percentiles stay within the measured samples
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "sessions": sessions,
+        "turns": len(samples),
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "max_ms": samples[-1] * 1000,
+        "turns_per_second": len(samples) / elapsed,
+    }
+
+
+def run_sync(graph, sessions, turns, threads):
+    def session(submitted):
+        config = _config()
+        samples = []
+        for turn in range(turns):
+            # The first turn also waits for a free worker thread
+            started = submitted if turn == 0 else time.perf_counter()
+            for _ in stream_turn(graph, {"messages": ("user", "What is my leave balance?")}, config):
+                pass
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(session, [started] * sessions))
+    return _summary([s for r in results for s in r], sessions, time.perf_counter() - started)
+
+
+def run_async(graph, sessions, turns):
+    async def session():
+        config = _config()
+        samples = []
+        for _ in range(turns):
+            started = time.perf_counter()
+            async for _ in astream_turn(graph, {"messages": ("user", "What is my leave balance?")}, config):
+                pass
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    async def all_sessions():
+        return await asyncio.gather(*(session() for _ in range(sessions)))
+
+    started = time.perf_counter()
+    results = aio.run(all_sessions())
+    return _summary([s for r in results for s in r], sessions, time.perf_counter() - started)
+
+
+def run(mode, max_sessions, turns, threads, slo_ms, llm_latency, db_latency, fast_path=False):
+    _install_data_source(db_latency)
+    graph = workflow.build_graph(llm=ScriptedChatModel(latency=llm_latency), fast_path=fast_path).compile(
+        checkpointer=MemorySaver()
+    )
+
+    levels = []
+    sessions = 1
+    while sessions <= max_sessions:
+        if mode == "async":
+            levels.append(run_async(graph, sessions, turns))
+        else:
+            levels.append(run_sync(graph, sessions, turns, threads))
+        sessions *= 2
+
+    within_slo = [level["sessions"] for level in levels if level["p95_ms"] <= slo_ms]
+    return {
+        "mode": mode,
+        "threads": threads if mode == "sync" else None,
+        "slo_p95_ms": slo_ms,
+        "llm_latency_ms": llm_latency * 1000,
+        "db_latency_ms": db_latency * 1000,
+        "fast_path": fast_path,
+        "levels": levels,
+        "max_sessions_within_slo": max(within_slo) if within_slo else 0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["sync", "async"], default="async")
+    parser.add_argument("--max-sessions", type=int, default=256)
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--threads", type=int, default=16, help="Worker threads in sync mode")
+    parser.add_argument("--slo-ms", type=float, default=1500, help="p95 turn latency objective")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per LLM call")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="Seconds per tool query")
+    parser.add_argument("--fast-path", action="store_true", help="Let the router answer the turns without the LLM")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.mode, args.max_sessions, args.turns, args.threads, args.slo_ms,
+                  args.llm_latency, args.db_latency, args.fast_path)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
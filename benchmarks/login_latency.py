@@ -0,0 +1,128 @@
+"""
+Offline benchmark of the Azure AD sign-in path of `app/auth.py` against the local mock of
+`benchmarks.mock_identity`: latency and identity-provider requests per login.
+
+Compares the original flow (a new MSAL application, a plain `requests.get` to Graph) with
+the cached one (process-wide MSAL application and HTTP session, cached /me profiles), and
+measures reruns of a session that still carry its redeemed code, replays of a used code
+from another session (which must fail), and silent token refreshes.
+
+Usage:
+    python -m benchmarks.login_latency --logins 20 --latency 0.02 [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from collections import Counter
+
+import requests
+import streamlit as st
+from msal import ConfidentialClientApplication
+
+from app import auth
+from benchmarks.mock_identity import MockIdentityServer
+
+
+def _legacy_login(code):
+    """The sign-in path before caching: a new application (with its discovery) per rerun."""
+    app = ConfidentialClientApplication(
+        client_id=auth.CLIENT_ID,
+        authority=f"{auth.AZURE_AUTHORITY_HOST}/{auth.TENANT_ID}",
+        client_credential=auth.CLIENT_SECRET,
+        instance_discovery=False,
+    )
+    token_result = app.acquire_token_by_authorization_code(code, scopes=auth.SCOPES, redirect_uri=auth.REDIRECT_URI)
+    if "access_token" not in token_result:
+        return None
+    response = requests.get(f"{auth.GRAPH_API_URL}/me", headers={"Authorization": f"Bearer {token_result['access_token']}"})
+    return response.json() if response.status_code == 200 else None
+
+
+def _new_session():
+    """Forgets the sign-in state of the session, as a new browser session starts without any."""
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+
+def _cached_login(code):
+    app = auth.initialize_app()
+    token_result = auth.redeem_code(app, code)
+    return auth.get_user_profile(token_result) if token_result else None
+
+
+def _measure(idp, login, codes, prepare=None):
+    """Times `login` per code; `prepare(code)` runs first, outside the timing and request counts."""
+    counted = Counter()
+    samples, failures = [], 0
+    for code in codes:
+        if prepare:
+            prepare(code)
+        idp.requests.clear()
+        started = time.perf_counter()
+        if login(code) is None:
+            failures += 1
+        samples.append(time.perf_counter() - started)
+        counted.update(idp.requests)
+    return {
+        "logins": len(codes),
+        "failures": failures,
+        "p50_ms": statistics.median(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "idp_requests_per_login": sum(counted.values()) / len(codes),
+        "idp_requests": dict(counted),
+    }
+
+
+def run(logins, latency):
+    with MockIdentityServer(latency=latency) as idp:
+        # Point the auth settings at the mock; MSAL and requests trust its certificate
+        auth.CLIENT_ID, auth.TENANT_ID, auth.CLIENT_SECRET = idp.client_id, idp.tenant_id, "mock-secret"
+        auth.REDIRECT_URI = "http://localhost:8501"
+        auth.AZURE_AUTHORITY_HOST, auth.GRAPH_API_URL = idp.url, f"{idp.url}/v1.0"
+        auth.AZURE_INSTANCE_DISCOVERY = False
+        os.environ["REQUESTS_CA_BUNDLE"] = idp.cert_path
+
+        users = [f"user-{index}" for index in range(logins)]
+        legacy = _measure(idp, _legacy_login, [idp.issue_code(user) for user in users])
+        # Each sign-in starts a new browser session
+        codes = [idp.issue_code(user) for user in users]
+        cached = _measure(idp, _cached_login, codes, prepare=lambda code: _new_session())
+        # A rerun of the signing-in session still carries the code it redeemed
+        rerun_codes = [idp.issue_code(user) for user in users]
+        rerun = _measure(idp, _cached_login, rerun_codes, prepare=lambda code: (_new_session(), _cached_login(code)))
+        # Another session presenting a used code (browser history, Referer, a shared link) is refused
+        replay = _measure(idp, _cached_login, codes, prepare=lambda code: _new_session())
+
+        # Access tokens expiring within MSAL's 5 minute margin are refreshed with the refresh token
+        idp.access_token_lifetime = 60
+        app = auth.initialize_app()
+        accounts = []
+        for user in users:
+            token_result = auth.redeem_code(app, idp.issue_code(user))
+            accounts.append(auth.home_account_id(token_result))
+        refresh = _measure(idp, lambda account_id: auth.acquire_token_silently(app, account_id), accounts)
+    return {
+        "latency_ms": latency * 1000,
+        "legacy_login": legacy,
+        "cached_login": cached,
+        "rerun_with_redeemed_code": rerun,
+        "replay_in_new_session": replay,
+        "silent_refresh": refresh,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=20, help="Distinct users signing in")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per identity provider response")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.logins, args.latency)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,193 @@
+"""
+A local stand-in for Azure AD and Microsoft Graph, for exercising `app/auth.py` offline.
+
+Serves OIDC discovery, the token endpoint (authorization code and refresh token grants)
+and Graph `/v1.0/me` over HTTPS with a self-signed certificate (MSAL only accepts https
+authorities), and counts the requests it receives. Tokens and ID tokens are unsigned;
+MSAL does not verify ID token signatures.
+
+Point the app at it with:
+    AZURE_AUTHORITY_HOST=<server.url>  GRAPH_API_URL=<server.url>/v1.0
+    AZURE_INSTANCE_DISCOVERY=false     REQUESTS_CA_BUNDLE=<server.cert_path>
+"""
+import base64
+import datetime
+import ipaddress
+import json
+import os
+import ssl
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def _self_signed_certificate(directory):
+    """Writes a certificate and key for localhost/127.0.0.1 and returns their paths."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+class MockIdentityServer:
+    """
+    Azure AD and Graph stand-in on https://localhost:<port>.
+
+    Args:
+        tenant_id (str): Tenant served under `/<tenant_id>`.
+        client_id (str): Audience of the ID tokens.
+        latency (float): Seconds each response is delayed, to simulate the network.
+        access_token_lifetime (int): `expires_in` of issued access tokens, in seconds.
+    """
+
+    def __init__(self, tenant_id="mock-tenant", client_id="mock-client", latency=0.0, access_token_lifetime=3600):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.latency = latency
+        self.access_token_lifetime = access_token_lifetime
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._codes = {}  # authorization code -> user object ID
+        self._refresh_tokens = {}  # refresh token -> user object ID
+        self._access_tokens = {}  # access token -> user object ID
+        self.cert_path, key_path = _self_signed_certificate(tempfile.mkdtemp(prefix="hr-leave-idp-"))
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_path, key_path)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self.url = f"https://localhost:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-identity", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def issue_code(self, user_id=None):
+        """Returns a one-time authorization code for `user_id` (a new user by default)."""
+        code = uuid.uuid4().hex
+        with self._lock:
+            self._codes[code] = user_id or str(uuid.uuid4())
+        return code
+
+    def _tokens(self, user_id):
+        access_token, refresh_token = uuid.uuid4().hex, uuid.uuid4().hex
+        self._access_tokens[access_token] = user_id
+        self._refresh_tokens[refresh_token] = user_id
+        now = int(time.time())
+        claims = {
+            "aud": self.client_id, "iss": f"{self.url}/{self.tenant_id}/v2.0", "iat": now, "nbf": now,
+            "exp": now + 3600, "oid": user_id, "sub": user_id, "tid": self.tenant_id,
+            "preferred_username": f"{user_id}@example.com", "name": f"User {user_id[:8]}",
+        }
+        return {
+            "token_type": "Bearer",
+            "scope": "User.Read openid profile offline_access",
+            "expires_in": self.access_token_lifetime,
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "id_token": f"{_b64({'alg': 'none', 'typ': 'JWT'})}.{_b64(claims)}.",
+            "client_info": _b64({"uid": user_id, "utid": self.tenant_id}),
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                if server.latency:
+                    time.sleep(server.latency)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                base = f"{server.url}/{server.tenant_id}"
+                if path == f"/{server.tenant_id}/v2.0/.well-known/openid-configuration":
+                    server.requests["discovery"] += 1
+                    self._send(200, {
+                        "issuer": f"{base}/v2.0",
+                        "authorization_endpoint": f"{base}/oauth2/v2.0/authorize",
+                        "token_endpoint": f"{base}/oauth2/v2.0/token",
+                    })
+                elif path == "/v1.0/me":
+                    server.requests["graph_me"] += 1
+                    token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                    user_id = server._access_tokens.get(token)
+                    if user_id is None:
+                        self._send(401, {"error": {"code": "InvalidAuthenticationToken"}})
+                    else:
+                        self._send(200, {"id": user_id, "displayName": f"User {user_id[:8]}",
+                                         "userPrincipalName": f"{user_id}@example.com"})
+                else:
+                    server.requests["other"] += 1
+                    self._send(404, {"error": "not_found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+                if urlparse(self.path).path != f"/{server.tenant_id}/oauth2/v2.0/token":
+                    server.requests["other"] += 1
+                    self._send(404, {"error": "not_found"})
+                    return
+                grant = form.get("grant_type")
+                server.requests[f"token_{grant}"] += 1
+                with server._lock:
+                    if grant == "authorization_code":
+                        user_id = server._codes.pop(form.get("code"), None)
+                    elif grant == "refresh_token":
+                        user_id = server._refresh_tokens.pop(form.get("refresh_token"), None)
+                    else:
+                        user_id = None
+                    body = server._tokens(user_id) if user_id else None
+                if body is None:
+                    self._send(400, {"error": "invalid_grant", "error_description": "Code or refresh token not valid"})
+                else:
+                    self._send(200, body)
+
+        return Handler
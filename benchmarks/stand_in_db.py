@@ -0,0 +1,230 @@
+"""
+Database stand-ins for the benchmarks: a SQLite connection that accepts the queries of
+`app/db.py`, seeding helpers, and round-trip counting for SQLite and Postgres connections.
+
+Plug a stand-in into the app's pool with `db.configure_pool(connect=...)`.
+"""
+import re
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+import psycopg2
+import psycopg2.extensions
+
+from app import db
+
+LEAVE_TYPES = [(1, "Vacation"), (2, "Sick Leave"), (3, "Personal Time")]
+
+
+def bench_user_id(index):
+    """Azure AD user ID of the `index`-th seeded employee."""
+    return f"bench-user-{index}"
+
+
+class RoundTripCounter:
+    """Counts statements and transaction commands sent to the database, across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = 0
+        self.transactions = 0
+
+    def statement(self):
+        with self._lock:
+            self.statements += 1
+
+    def transaction(self):
+        with self._lock:
+            self.transactions += 1
+
+    @property
+    def round_trips(self):
+        return self.statements + self.transactions
+
+    def reset(self):
+        with self._lock:
+            self.statements = 0
+            self.transactions = 0
+
+
+# Postgres `value::type` casts, which SQLite does not need
+_POSTGRES_CAST = re.compile(r"::\w+")
+
+
+class _SQLiteCursor:
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection._conn.cursor()
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query, params=None):
+        self._connection.counter.statement()
+        query = _POSTGRES_CAST.sub("", query).replace("%s", "?").replace("NOW()", "CURRENT_TIMESTAMP")
+        try:
+            self._cursor.execute(query, params or ())
+            # Like psycopg2, hold the whole result client-side, so a commit may precede the fetch
+            self._rows = self._cursor.fetchall() if self._cursor.description else []
+        except sqlite3.Error as e:
+            # Surface errors the way the app expects them from psycopg2
+            raise psycopg2.DatabaseError(str(e)) from e
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    A SQLite connection exposing the part of psycopg2's connection interface used by
+    `app/db.py`: `cursor()` (also as a context manager), `commit`, `rollback` and `close`.
+    `%s` placeholders, `::type` casts and `NOW()` are translated to SQLite.
+    """
+
+    def __init__(self, path, counter=None):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.counter = counter or RoundTripCounter()
+        self.closed = 0
+
+    def cursor(self):
+        return _SQLiteCursor(self)
+
+    def commit(self):
+        self.counter.transaction()
+        self._conn.commit()
+
+    def rollback(self):
+        self.counter.transaction()
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+        self.closed = 1
+
+
+def sqlite_connect(path, counter):
+    """Returns a `connect` callable for `db.configure_pool` that opens SQLite stand-ins."""
+    return lambda: SQLiteConnection(path, counter)
+
+
+def postgres_connect(counter):
+    """
+    Returns a `connect` callable for `db.configure_pool` that opens counting psycopg2
+    connections, set up like the app's (`db._connect`).
+    """
+
+    class CountingCursor(psycopg2.extensions.cursor):
+        def execute(self, query, params=None):
+            counter.statement()
+            return super().execute(query, params)
+
+    class CountingConnection(db.PreparingConnection):
+        def commit(self):
+            counter.transaction()
+            return super().commit()
+
+        def rollback(self):
+            counter.transaction()
+            return super().rollback()
+
+    def connect():
+        conn = psycopg2.connect(
+            host=db.POSTGRES_HOST,
+            database=db.POSTGRES_DB,
+            user=db.POSTGRES_USER,
+            password=db.POSTGRES_PASSWORD,
+            connection_factory=CountingConnection,
+            cursor_factory=CountingCursor,
+        )
+        conn.autocommit = True
+        return conn
+
+    return connect
+
+
+SCHEMA = {
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS employees (employee_id INTEGER PRIMARY KEY, user_id TEXT);
+        CREATE TABLE IF NOT EXISTS leave_types (leave_type_id INTEGER PRIMARY KEY, leave_type_name TEXT);
+        CREATE TABLE IF NOT EXISTS leave_balances (employee_id INTEGER, leave_type_id INTEGER, available_days REAL, used_days REAL);
+        CREATE TABLE IF NOT EXISTS leave_requests (
+            leave_request_id INTEGER PRIMARY KEY, employee_id INTEGER, leave_type_id INTEGER, start_date TEXT,
+            end_date TEXT, days_requested REAL, reason TEXT, status TEXT, request_date TEXT
+        );
+    """,
+    "postgres": """
+        CREATE TABLE IF NOT EXISTS employees (employee_id SERIAL PRIMARY KEY, user_id TEXT);
+        CREATE TABLE IF NOT EXISTS leave_types (leave_type_id SERIAL PRIMARY KEY, leave_type_name TEXT);
+        CREATE TABLE IF NOT EXISTS leave_balances (employee_id INTEGER, leave_type_id INTEGER, available_days NUMERIC, used_days NUMERIC);
+        CREATE TABLE IF NOT EXISTS leave_requests (
+            leave_request_id SERIAL PRIMARY KEY, employee_id INTEGER, leave_type_id INTEGER, start_date DATE,
+            end_date DATE, days_requested NUMERIC, reason TEXT, status TEXT, request_date TIMESTAMP
+        );
+    """,
+}
+
+
+def seed(conn, employees, dialect="sqlite"):
+    """
+    Creates the app's tables if needed and adds `employees` benchmark employees that do not
+    exist yet, each with a balance for every leave type, one pending and one approved request.
+
+    Args:
+        conn: A connection from `SQLiteConnection` or psycopg2.
+        employees (int): Number of employees (`bench-user-0` ... `bench-user-{n-1}`).
+        dialect (str): "sqlite" or "postgres".
+    """
+    with conn.cursor() as cur:
+        for statement in SCHEMA[dialect].split(";"):
+            if statement.strip():
+                cur.execute(statement)
+        for leave_type_id, name in LEAVE_TYPES:
+            cur.execute(
+                "INSERT INTO leave_types (leave_type_id, leave_type_name) SELECT %s, %s "
+                "WHERE NOT EXISTS (SELECT 1 FROM leave_types WHERE leave_type_id = %s)",
+                (leave_type_id, name, leave_type_id),
+            )
+        start = date(2025, 1, 6)
+        for index in range(employees):
+            user_id = bench_user_id(index)
+            cur.execute("SELECT employee_id FROM employees WHERE user_id = %s", (user_id,))
+            if cur.fetchone():
+                continue
+            cur.execute("INSERT INTO employees (user_id) VALUES (%s)", (user_id,))
+            cur.execute("SELECT employee_id FROM employees WHERE user_id = %s", (user_id,))
+            employee_id = cur.fetchone()[0]
+            for leave_type_id, _ in LEAVE_TYPES:
+                cur.execute(
+                    "INSERT INTO leave_balances (employee_id, leave_type_id, available_days, used_days) "
+                    "VALUES (%s, %s, %s, %s)",
+                    (employee_id, leave_type_id, 10 + 5 * leave_type_id, index % 5),
+                )
+            day = start + timedelta(days=index % 200)
+            cur.execute(
+                "INSERT INTO leave_requests (employee_id, leave_type_id, start_date, end_date, days_requested, "
+                "reason, status, request_date) VALUES (%s, 1, %s, %s, 1, 'Seeded', 'Pending', NOW())",
+                (employee_id, day.isoformat(), day.isoformat()),
+            )
+            past = day - timedelta(days=60)
+            cur.execute(
+                "INSERT INTO leave_requests (employee_id, leave_type_id, start_date, end_date, days_requested, "
+                "reason, status, request_date) VALUES (%s, 2, %s, %s, 1, 'Seeded', 'Approved', NOW())",
+                (employee_id, past.isoformat(), past.isoformat()),
+            )
+    conn.commit()
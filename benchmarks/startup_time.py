@@ -0,0 +1,115 @@
+"""
+Measures the import cost of the app's entry points with `python -X importtime`.
+
+Each scenario runs in a fresh interpreter:
+
+- "login": `import main`, all a Streamlit rerun of the login page needs.
+- "chat": the login path plus `app.workflow`, what the first chat turn (or the warm-up
+  thread) imports.
+- "eager": the chat path plus the Vertex AI and Langfuse SDKs, the modules `main.py`
+  imported up front before they were loaded lazily by `app.clients`.
+
+Reports the median import time and interpreter wall time of each scenario, and the
+heaviest imports of its last run among the top-level ones and their direct imports.
+Stub Vertex AI settings are supplied; no network access is needed.
+
+Usage:
+    python -m benchmarks.startup_time --runs 5 [--top 10] [--output results.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    "login": "import main",
+    "chat": "import main; import app.workflow",
+    "eager": "import main; import app.workflow; import vertexai; import langchain_google_vertexai; import langfuse.callback",
+}
+
+# import time: <self us> | <cumulative us> | <indent><module>
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _environment():
+    env = dict(os.environ)
+    env.setdefault("PROJECT_ID", "startup-benchmark")
+    env.setdefault("REGION", "us-central1")
+    env.setdefault("MODEL_NAME", "gemini-1.5-flash")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def parse_importtime(output):
+    """
+    Parses `-X importtime` output.
+
+    Returns:
+        list: (module, depth, cumulative seconds) of each import, depth 0 being top-level.
+    """
+    imports = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            # Nested imports are indented by two spaces per level below the top-level one
+            depth = (len(match.group(3)) - 1) // 2
+            imports.append((match.group(4), depth, int(match.group(2)) / 1e6))
+    return imports
+
+
+def measure(code):
+    """Runs `code` in a new interpreter with `-X importtime`; returns (wall seconds, imports)."""
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=_ROOT, env=_environment(), capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{process.stderr[-2000:]}")
+    return wall, parse_importtime(process.stderr)
+
+
+def _heaviest(imports, top):
+    """The `top` slowest imports among the top-level ones and their direct imports."""
+    shallow = sorted((item for item in imports if item[1] <= 1), key=lambda item: -item[2])
+    return {module: seconds * 1000 for module, _, seconds in shallow[:top]}
+
+
+def run(runs, top):
+    results = {}
+    for name, code in SCENARIOS.items():
+        measure(code)  # Writes the bytecode caches, so every measured run starts alike
+        walls, totals = [], []
+        for _ in range(runs):
+            wall, imports = measure(code)
+            walls.append(wall)
+            totals.append(sum(seconds for _, depth, seconds in imports if depth == 0))
+        results[name] = {
+            "runs": runs,
+            "import_ms": statistics.median(totals) * 1000,
+            "wall_ms": statistics.median(walls) * 1000,
+            "heaviest_imports_ms": _heaviest(imports, top),
+        }
+    results["login_vs_eager_speedup"] = results["eager"]["import_ms"] / results["login"]["import_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Measured interpreter starts per scenario")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest top-level imports to report")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.top)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
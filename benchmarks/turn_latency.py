@@ -0,0 +1,183 @@
+"""
+Offline benchmark of conversation turns: latency percentiles, DB round-trips per turn and
+throughput at N concurrent simulated employees.
+
+Drives the graph from `workflow.build_graph()` with the scripted chat model of
+`benchmarks.fakes`, through the app's connection pool and caches, against a seeded SQLite
+stand-in (default) or a local Postgres (`--backend postgres`, using the POSTGRES_*
+settings; add `--seed` to create, fill and index the tables). The results include the
+EXPLAIN check of `benchmarks.index_check`. Each employee runs in its own
+thread, as Streamlit runs each session, and resolves its employee ID once per session as
+`main.get_employee_id` does. No Vertex AI, Azure AD or Cloud SQL access is needed.
+
+Usage:
+    python -m benchmarks.turn_latency --employees 1,8,32 --turns 8 [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from app import db, llm_cache, schema, workflow
+from app.instrumentation import GraphMetricsCallback
+from app.metrics import registry
+from app.streaming import stream_turn
+from benchmarks.fakes import WORKLOAD, ScriptedChatModel
+from benchmarks.index_check import check_indexes
+from benchmarks.stand_in_db import (
+    RoundTripCounter, SQLiteConnection, bench_user_id, postgres_connect, seed, sqlite_connect,
+)
+
+
+GRAPH_METRICS = GraphMetricsCallback()
+
+# Histograms reported as the per-turn time breakdown
+BREAKDOWN = ("graph_node_seconds", "llm_seconds", "tool_seconds", "db_query_seconds", "db_pool_wait_seconds")
+
+
+def percentiles(samples):
+    """Returns p50/p95/p99 and the mean of `samples` (seconds) in milliseconds."""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "mean_ms": statistics.mean(samples) * 1000,
+    }
+
+
+def _clear_caches():
+    """Empties the read-through caches and the reply cache, so every level starts cold."""
+    backends = [cache.backend for cache in (
+        db.employee_id_cache, db.leave_balance_cache, db.pending_requests_cache, db.leave_dashboard_cache,
+    )]
+    for backend in backends + [llm_cache.response_cache.backend]:
+        if hasattr(backend, "clear"):
+            backend.clear()
+
+
+def _session(graph, index, turns):
+    user_id = bench_user_id(index)
+    config = {
+        "configurable": {
+            "user_id": user_id,
+            "employee_id": db.resolve_employee_id(user_id),
+            "thread_id": uuid.uuid4().hex,
+        },
+        "callbacks": [GRAPH_METRICS],
+    }
+    samples, errors = [], 0
+    for turn in range(turns):
+        prompt = WORKLOAD[turn % len(WORKLOAD)]
+        started = time.perf_counter()
+        try:
+            for _ in stream_turn(graph, {"messages": ("user", prompt)}, config):
+                pass
+        except Exception:
+            errors += 1
+            continue
+        samples.append(time.perf_counter() - started)
+    return samples, errors
+
+
+def breakdown():
+    """Returns the mean milliseconds of each instrumented stage, from the metrics registry."""
+    stages = {}
+    for histogram in registry.snapshot()["histograms"]:
+        if histogram["name"] in BREAKDOWN and histogram["count"]:
+            label = ",".join(f"{key}={value}" for key, value in sorted(histogram["labels"].items()))
+            stages[f"{histogram['name']}{{{label}}}"] = {
+                "count": histogram["count"],
+                "mean_ms": histogram["sum"] / histogram["count"] * 1000,
+            }
+    return stages
+
+
+def run_level(graph, counter, employees, turns):
+    _clear_caches()
+    counter.reset()
+    registry.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=employees) as executor:
+        results = list(executor.map(lambda index: _session(graph, index, turns), range(employees)))
+    elapsed = time.perf_counter() - started
+    samples = [sample for session_samples, _ in results for sample in session_samples]
+    completed = len(samples)
+    return {
+        "employees": employees,
+        "turns": completed,
+        "errors": sum(errors for _, errors in results),
+        **percentiles(samples),
+        "throughput_turns_per_second": completed / elapsed if elapsed else None,
+        "db_round_trips_per_turn": counter.round_trips / completed if completed else None,
+        "db_statements_per_turn": counter.statements / completed if completed else None,
+        "breakdown": breakdown(),
+    }
+
+
+def run(levels, turns, backend="sqlite", llm_latency=0.0, seed_postgres=False, pool_max=None, fast_path=True):
+    counter = RoundTripCounter()
+    if backend == "postgres":
+        connect = postgres_connect(counter)
+        conn = connect()
+        try:
+            if seed_postgres:
+                seed(conn, max(levels), dialect="postgres")
+                schema.migrate(conn)
+            index_check = check_indexes(conn, "postgres")
+        finally:
+            conn.close()
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="hr-leave-bench-"), "leave.sqlite")
+        conn = SQLiteConnection(path)
+        seed(conn, max(levels))
+        schema.migrate(conn, concurrently=False)
+        index_check = check_indexes(conn)
+        conn.close()
+        connect = sqlite_connect(path, counter)
+    db.configure_pool(connect=connect, maxconn=pool_max or db.POSTGRES_POOL_MAX)
+
+    graph = workflow.build_graph(llm=ScriptedChatModel(latency=llm_latency), fast_path=fast_path).compile(
+        checkpointer=MemorySaver()
+    )
+    try:
+        results = [run_level(graph, counter, employees, turns) for employees in levels]
+    finally:
+        db.get_pool().closeall()
+    return {
+        "backend": backend,
+        "llm_latency_ms": llm_latency * 1000,
+        "turns_per_employee": turns,
+        "pool_max": pool_max or db.POSTGRES_POOL_MAX,
+        "fast_path": fast_path,
+        "index_check": index_check,
+        "levels": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--employees", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=8, help="Turns per employee")
+    parser.add_argument("--backend", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--seed", action="store_true", help="Create and seed the Postgres tables")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--pool-max", type=int, help="Connection pool size (default POSTGRES_POOL_MAX)")
+    parser.add_argument("--no-fast-path", action="store_true", help="Send every turn to the LLM, bypassing the router")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run([int(level) for level in args.employees.split(",")], args.turns, args.backend,
+                  args.llm_latency, args.seed, args.pool_max, not args.no_fast_path)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
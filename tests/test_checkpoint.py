@@ -0,0 +1,49 @@
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from app.checkpoint import BoundedMemorySaver, ahas_checkpoint, has_checkpoint
+
+
+class _State(TypedDict):
+    turns: Annotated[list, operator.add]
+
+
+def _graph(saver):
+    builder = StateGraph(_State)
+    builder.add_node("reply", lambda state: {"turns": ["reply"]})
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=saver)
+
+
+def _turn(graph, thread_id):
+    graph.invoke({"turns": ["user"]}, {"configurable": {"thread_id": thread_id}})
+
+
+def test_evicted_threads_have_no_checkpoint():
+    saver = BoundedMemorySaver(max_threads=1)
+    graph = _graph(saver)
+    _turn(graph, "first")
+    assert has_checkpoint(saver, "first")
+    _turn(graph, "second")
+    assert not has_checkpoint(saver, "first")
+    assert has_checkpoint(saver, "second")
+    assert asyncio.run(ahas_checkpoint(saver, "second"))
+    assert not asyncio.run(ahas_checkpoint(saver, "first"))
+
+
+def test_unknown_threads_have_no_checkpoint():
+    saver = BoundedMemorySaver()
+    assert not has_checkpoint(saver, "never-used")
+    assert saver.stats()["threads"] == 0
+
+
+def test_failed_lookups_count_as_present():
+    class BrokenSaver:
+        def get_tuple(self, config):
+            raise RuntimeError("database unavailable")
+
+    assert has_checkpoint(BrokenSaver(), "thread")
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import psycopg2.pool
+import pytest
+
+from app.db import ConnectionPool, PoolTimeout
+from benchmarks.stand_in_db import sqlite_connect
+
+
+@pytest.fixture
+def connect(tmp_path):
+    return sqlite_connect(str(tmp_path / "pool.db"), None)
+
+
+def test_checkout_reuses_returned_connections(connect):
+    pool = ConnectionPool(connect, minconn=0, maxconn=2, timeout=1)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    stats = pool.stats()
+    assert (stats["checkouts_total"], stats["in_use"], stats["idle"]) == (2, 1, 0)
+
+
+def test_minconn_connections_are_opened_eagerly(connect):
+    pool = ConnectionPool(connect, minconn=2, maxconn=3, timeout=1)
+    assert pool.stats()["idle"] == 2
+
+
+def test_checkout_times_out_when_all_connections_are_in_use(connect):
+    pool = ConnectionPool(connect, minconn=0, maxconn=1, timeout=0.05)
+    pool.getconn()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.05
+    assert pool.stats()["timeouts_total"] == 1
+
+
+def test_waiting_checkout_gets_the_returned_connection(connect):
+    pool = ConnectionPool(connect, minconn=0, maxconn=1, timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+    assert pool.getconn() is conn
+    assert pool.stats()["wait_seconds_max"] > 0
+
+
+def test_discarded_connections_are_closed_and_replaced(connect):
+    pool = ConnectionPool(connect, minconn=0, maxconn=1, timeout=0.05)
+    conn = pool.getconn()
+    pool.putconn(conn, discard=True)
+    assert conn.closed
+    assert pool.stats()["in_use"] == 0
+    replacement = pool.getconn()
+    assert replacement is not conn
+
+
+def test_broken_idle_connections_are_not_handed_out(connect):
+    pool = ConnectionPool(connect, minconn=0, maxconn=1, timeout=1)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.close()
+    assert pool.getconn() is not conn
+    assert pool.stats()["health_check_failures_total"] == 1
+
+
+def test_idle_connections_are_pinged_after_health_check_after(connect):
+    pool = ConnectionPool(connect, minconn=0, maxconn=1, timeout=1, health_check_after=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_connection_context_returns_the_connection(connect):
+    pool = ConnectionPool(connect, minconn=0, maxconn=1, timeout=0.05)
+    with pool.connection() as conn:
+        assert pool.stats()["in_use"] == 1
+    assert pool.stats()["in_use"] == 0
+    assert pool.getconn() is conn
+
+
+def test_closed_pool_refuses_checkouts(connect):
+    pool = ConnectionPool(connect, minconn=1, maxconn=1, timeout=0.05)
+    pool.closeall()
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.getconn()
+
+
+def test_invalid_sizes_are_rejected(connect):
+    with pytest.raises(ValueError):
+        ConnectionPool(connect, minconn=2, maxconn=1)
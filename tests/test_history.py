@@ -0,0 +1,36 @@
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app import history
+from app.history import HistorySummarizer
+
+
+def _conversation(turns):
+    messages = []
+    for turn in range(turns):
+        messages += [HumanMessage(content=f"Question {turn} " * 20, id=f"h{turn}"),
+                     AIMessage(content=f"Answer {turn} " * 20, id=f"a{turn}")]
+    return messages
+
+
+def test_default_model_is_created_on_the_first_summary(monkeypatch):
+    created = []
+
+    def get_chat_llm():
+        created.append(True)
+        return FakeListChatModel(responses=["The employee asked about their leave."])
+
+    monkeypatch.setattr(history, "get_chat_llm", get_chat_llm)
+    summarizer = HistorySummarizer(budget=200, keep_tokens=100)
+    assert summarizer({"messages": _conversation(1)}) == {}
+    assert not created
+
+    update = summarizer({"messages": _conversation(4)})
+    assert created
+    assert update["summary"] == "The employee asked about their leave."
+    assert update["messages"]
+
+
+def test_history_within_budget_is_left_alone():
+    summarizer = HistorySummarizer(FakeListChatModel(responses=["unused"]), budget=10_000)
+    assert summarizer({"messages": _conversation(4)}) == {}
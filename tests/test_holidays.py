@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.holidays import HolidayCalendar
+
+NEW_YEAR = date(2030, 1, 1)  # A Tuesday
+
+
+def _brute_force(calendar, start_date, end_date):
+    return sum(calendar.is_working_day(start_date + timedelta(days=offset))
+               for offset in range((end_date - start_date).days + 1))
+
+
+def test_weekends_are_not_working_days():
+    calendar = HolidayCalendar()
+    # Friday to Monday
+    assert calendar.working_days(date(2030, 1, 4), date(2030, 1, 7)) == 2
+    assert calendar.working_days(date(2030, 1, 5), date(2030, 1, 6)) == 0
+
+
+def test_holidays_on_working_days_are_not_counted():
+    calendar = HolidayCalendar([NEW_YEAR])
+    assert calendar.working_days(date(2029, 12, 31), date(2030, 1, 4)) == 4
+    assert not calendar.is_working_day(NEW_YEAR)
+
+
+def test_holidays_on_weekends_take_no_working_day_off():
+    calendar = HolidayCalendar([date(2030, 1, 5)])
+    assert calendar.working_days(date(2030, 1, 1), date(2030, 1, 31)) == 23
+
+
+def test_end_before_start_has_no_working_days():
+    assert HolidayCalendar().working_days(date(2030, 1, 7), date(2030, 1, 1)) == 0
+
+
+@pytest.mark.parametrize("working_weekdays", [(0, 1, 2, 3, 4), (0, 1, 2, 3, 4, 5), (6,), ()])
+def test_working_days_match_a_day_by_day_count(working_weekdays):
+    calendar = HolidayCalendar([NEW_YEAR, date(2030, 1, 5), date(2030, 2, 14), date(2030, 4, 1)], working_weekdays)
+    start = date(2029, 12, 20)
+    for offset in range(0, 40, 3):
+        for length in range(0, 120, 7):
+            start_date = start + timedelta(days=offset)
+            end_date = start_date + timedelta(days=length)
+            assert calendar.working_days(start_date, end_date) == _brute_force(calendar, start_date, end_date)
+
+
+def test_holiday_file_allows_names_comments_and_blank_lines(tmp_path):
+    path = tmp_path / "holidays.txt"
+    path.write_text("# Company holidays\n2030-01-01 New Year's Day\n\n2030-01-02\n", encoding="utf-8")
+    calendar = HolidayCalendar.from_file(path)
+    assert calendar.working_days(date(2029, 12, 31), date(2030, 1, 4)) == 3
+
+
+def test_holiday_file_with_a_bad_date_is_refused(tmp_path):
+    path = tmp_path / "holidays.txt"
+    path.write_text("01/01/2030\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        HolidayCalendar.from_file(path)
@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+
+from app import workflow
+from app.holidays import HolidayCalendar
+from app.workflow import format_leave_batch, prepare_leave_batch
+
+
+@pytest.fixture(autouse=True)
+def calendar(monkeypatch):
+    # New Year's Day, a Tuesday
+    monkeypatch.setattr(workflow, "get_calendar", lambda: HolidayCalendar([date(2030, 1, 1)]))
+
+
+def _request(start_date, end_date, leave_type_id=1, reason="Trip"):
+    return {"leave_type_id": leave_type_id, "start_date": start_date, "end_date": end_date, "reason": reason}
+
+
+def test_valid_ranges_are_counted_in_working_days():
+    statuses, rows = prepare_leave_batch([
+        _request("2029-12-31", "2030-01-04"),
+        _request("2030-01-07", "2030-01-07", leave_type_id=2, reason=""),
+    ])
+    assert statuses == [None, None]
+    assert rows == [(1, "2029-12-31", "2030-01-04", 4, "Trip"), (2, "2030-01-07", "2030-01-07", 1, "None")]
+
+
+@pytest.mark.parametrize("start_date, end_date, status", [
+    ("2030-01-07", "2030-01-04", "invalid_dates"),
+    ("07/01/2030", "2030-01-08", "invalid_dates"),
+    ("2030-01-07", None, "invalid_dates"),
+    ("2030-01-05", "2030-01-06", "no_working_days"),
+    ("2030-01-01", "2030-01-01", "no_working_days"),
+])
+def test_ranges_without_working_days_are_rejected(start_date, end_date, status):
+    statuses, rows = prepare_leave_batch([_request(start_date, end_date)])
+    assert statuses == [status]
+    assert rows == []
+
+
+def test_rejected_ranges_keep_their_place():
+    statuses, rows = prepare_leave_batch([
+        _request("2030-01-05", "2030-01-06"), _request("2030-01-07", "2030-01-08"),
+    ])
+    assert statuses == ["no_working_days", None]
+    assert [row[1] for row in rows] == ["2030-01-07"]
+
+
+def test_format_reports_every_range_in_order():
+    requests = [
+        _request("2030-01-05", "2030-01-06"),
+        _request("2030-01-07", "2030-01-08"),
+        _request("2030-01-08", "2030-01-09"),
+        _request("2030-01-14", "2030-01-18"),
+    ]
+    statuses, rows = prepare_leave_batch(requests)
+    results = [("submitted", 11, 10), ("overlaps_batch", None, 8), ("insufficient_balance", None, 3)]
+    response = format_leave_batch(requests, statuses, rows, results)
+    assert response.splitlines() == [
+        "Submitted 1 of 4 leave request(s):",
+        "",
+        "- 2030-01-05 to 2030-01-06: " + workflow.LEAVE_BATCH_OUTCOMES["no_working_days"],
+        "- 2030-01-07 to 2030-01-08 (2 working day(s)): " + workflow.LEAVE_BATCH_OUTCOMES["submitted"],
+        "- 2030-01-08 to 2030-01-09 (2 working day(s)): " + workflow.LEAVE_BATCH_OUTCOMES["overlaps_batch"],
+        "- 2030-01-14 to 2030-01-18 (5 working day(s)): "
+        + workflow.LEAVE_BATCH_OUTCOMES["insufficient_balance"] + " (3 day(s) left)",
+    ]
+
+
+def test_format_reports_a_failed_batch():
+    requests = [_request("2030-01-07", "2030-01-08")]
+    statuses, rows = prepare_leave_batch(requests)
+    assert format_leave_batch(requests, statuses, rows, None).startswith("Failed to submit the leave requests")
+
+
+def test_batch_of_rejected_ranges_is_not_sent(monkeypatch):
+    monkeypatch.setattr(workflow.db, "connect_to_db", lambda: pytest.fail("The database was queried"))
+    response = workflow._request_leave_batch("user-1", [_request("2030-01-05", "2030-01-06")])
+    assert response.startswith("Submitted 0 of 1 leave request(s)")
+
+
+def test_single_request_without_working_days_is_not_sent(monkeypatch):
+    monkeypatch.setattr(workflow.db, "connect_to_db", lambda: pytest.fail("The database was queried"))
+    assert workflow._request_leave("user-1", 1, "2030-01-05", "2030-01-06", "Trip") == workflow.NO_WORKING_DAYS
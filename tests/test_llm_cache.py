@@ -0,0 +1,33 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.cache import create_backend
+from app.llm_cache import ResponseCache
+
+
+def _state(*messages):
+    return {"user_info": "user-1", "time": "2030-01-07 09:00", "messages": list(messages)}
+
+
+def test_replies_are_reused_for_the_same_conversation():
+    cache = ResponseCache(backend=create_backend("memory", maxsize=10, ttl=60))
+    state = _state(HumanMessage(content="Hi"), AIMessage(content="Hello!"), HumanMessage(content="Thanks"))
+    cache.store(state, AIMessage(content="You're welcome."))
+    assert cache.lookup(state).content == "You're welcome."
+
+
+def test_replies_are_not_reused_for_an_earlier_different_turn():
+    cache = ResponseCache(backend=create_backend("memory", maxsize=10, ttl=60))
+    cache.store(
+        _state(HumanMessage(content="Book Monday"), AIMessage(content="Done."), HumanMessage(content="Is that ok?")),
+        AIMessage(content="Yes, Monday is booked."),
+    )
+    # Same preceding reply and message, but about another request
+    state = _state(HumanMessage(content="Book Friday"), AIMessage(content="Done."), HumanMessage(content="Is that ok?"))
+    assert cache.lookup(state) is None
+
+
+def test_replies_are_not_shared_between_users():
+    cache = ResponseCache(backend=create_backend("memory", maxsize=10, ttl=60))
+    state = _state(HumanMessage(content="Thanks"))
+    cache.store(state, AIMessage(content="You're welcome."))
+    assert cache.lookup({**state, "user_info": "user-2"}) is None
@@ -0,0 +1,53 @@
+import threading
+from types import SimpleNamespace
+
+import langchain_google_vertexai
+import pytest
+
+from app import prompts
+
+LLM = SimpleNamespace(model_name="gemini-test")
+TOOLS = [SimpleNamespace(name="fetch_leave_balance")]
+
+
+@pytest.fixture(autouse=True)
+def empty_context_caches(monkeypatch):
+    monkeypatch.setattr(prompts, "_context_caches", {})
+    monkeypatch.setattr(prompts, "_context_caches_creating", set())
+
+
+def test_context_cache_is_created_once_and_reused(monkeypatch):
+    created = []
+    monkeypatch.setattr(langchain_google_vertexai, "create_context_cache",
+                        lambda *args, **kwargs: created.append(True) or f"cache-{len(created)}")
+    assert prompts.get_context_cache(LLM, TOOLS) == "cache-1"
+    assert prompts.get_context_cache(LLM, TOOLS) == "cache-1"
+    assert len(created) == 1
+
+
+def test_failed_creation_falls_back_to_the_full_prompt(monkeypatch):
+    def create_context_cache(*args, **kwargs):
+        raise ValueError("prompt below the minimum cache size")
+
+    monkeypatch.setattr(langchain_google_vertexai, "create_context_cache", create_context_cache)
+    assert prompts.get_context_cache(LLM, TOOLS) is None
+    assert prompts._context_caches_creating == set()
+
+
+def test_other_callers_do_not_wait_for_a_creation(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def create_context_cache(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return "cache-1"
+
+    monkeypatch.setattr(langchain_google_vertexai, "create_context_cache", create_context_cache)
+    creator = threading.Thread(target=prompts.get_context_cache, args=(LLM, TOOLS))
+    creator.start()
+    assert started.wait(5)
+    # The cache is being created: the full prompt is sent instead of blocking
+    assert prompts.get_context_cache(LLM, TOOLS) is None
+    release.set()
+    creator.join(5)
+    assert prompts.get_context_cache(LLM, TOOLS) == "cache-1"
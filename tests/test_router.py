@@ -0,0 +1,71 @@
+import pytest
+
+from app.router import Route, classify
+
+
+@pytest.mark.parametrize("text, tool", [
+    ("Show my leave balance", "fetch_leave_balance"),
+    ("How much vacation do I have?", "fetch_leave_balance"),
+    ("How many days of leave left?", "fetch_leave_balance"),
+    ("remaining leave", "fetch_leave_balance"),
+    ("What's my leave balance?", "fetch_leave_balance"),
+    ("Show my pending requests", "fetch_pending_requests"),
+    ("Which requests are not yet approved?", "fetch_pending_requests"),
+    ("My leave balance and pending requests", "fetch_leave_dashboard"),
+])
+def test_english_lookups_are_routed(text, tool):
+    assert classify(text) == Route(tool, "en")
+
+
+@pytest.mark.parametrize("text, tool", [
+    ("ขอดูวันลาคงเหลือ", "fetch_leave_balance"),
+    ("ยอดวันลาของฉัน", "fetch_leave_balance"),
+    ("คำขอลาที่รออนุมัติ", "fetch_pending_requests"),
+    ("ตรวจสอบวันลาที่ส่งไป", "fetch_pending_requests"),
+    ("คำขอลาที่ยื่นไปแล้วค้างอนุมัติไหม", "fetch_pending_requests"),
+    ("สถานะคำขอลา", "fetch_pending_requests"),
+])
+def test_thai_lookups_are_routed(text, tool):
+    assert classify(text) == Route(tool, "th")
+
+
+@pytest.mark.parametrize("text", [
+    # Not about leave
+    "How many days left until Christmas?",
+    "balance sheet of the company",
+    "hello",
+    # Negated
+    "I do not want to see my balance",
+    "Don't show my leave balance",
+    "I don't need my pending requests",
+    # Someone else's
+    "What's John's balance?",
+    "What's John's leave balance?",
+    "Leave balance for Mary",
+    "Show the employees' pending requests",
+    "my manager's pending approvals",
+    # Actions, conditions and dates
+    "Request leave for next Monday",
+    "Cancel my pending request",
+    "If I take 3 days, what is my leave balance?",
+    "",
+])
+def test_english_messages_go_to_the_assistant(text):
+    assert classify(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "ขอลาพักร้อนวันศุกร์",
+    "ยื่นลาป่วย",
+    "ยกเลิกคำขอลาที่รออนุมัติ",
+    "วันลาคงเหลือของสมชาย",
+    "ไม่ต้องแสดงวันลาคงเหลือ",
+    "วันลาคงเหลือของลูกทีม",
+    "สวัสดี",
+])
+def test_thai_messages_go_to_the_assistant(text):
+    assert classify(text) is None
+
+
+def test_long_messages_go_to_the_assistant():
+    assert classify("Show my leave balance " + "please " * 20) is None